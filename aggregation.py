@@ -0,0 +1,107 @@
+import numpy as np
+from order_lines import get_order_lines
+
+
+def encode(values):
+    """Integer-code a text column, returns (codes, sorted categories)"""
+    categories, codes = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+    return codes.reshape(-1), categories
+
+
+def get_codes(snapshot, field):
+    """Integer codes for a text field of the snapshot's order lines (cached)"""
+    key = f"codes:{field}"
+    if key not in snapshot.cache:
+        snapshot.cache[key] = encode(getattr(get_order_lines(snapshot), field))
+    return snapshot.cache[key]
+
+
+def _not_blank(codes, categories):
+    """Mask of rows whose category isn't the empty string"""
+    return (categories != '')[codes] if len(categories) else np.zeros(len(codes), dtype=bool)
+
+
+def production_totals(snapshot):
+    """Pick-up / shipping bag counts per school and flavor, in one pass
+
+    Returns (schools_data, all_flavors_data, grand_totals):
+    {school: {flavor: {'pickup', 'shipping'}}}, {flavor: {'pickup', 'shipping'}}
+    and {'pickup', 'shipping'}.
+    """
+    if 'production_totals' in snapshot.cache:
+        return snapshot.cache['production_totals']
+
+    lines = get_order_lines(snapshot)
+    school_codes, schools = get_codes(snapshot, 'school')
+    flavor_codes, flavors = get_codes(snapshot, 'flavor')
+    delivery_codes, deliveries = get_codes(snapshot, 'delivery')
+    quantity = np.asarray(lines.quantity, dtype=np.int64)
+
+    # Delivery type per category: 1 = pick-up, 0 = shipping
+    is_pickup = np.array(['pick' in delivery.lower() for delivery in deliveries], dtype=np.int64)
+    pickup = is_pickup[delivery_codes] if len(deliveries) else np.zeros(len(lines), dtype=np.int64)
+
+    valid = _not_blank(school_codes, schools) & _not_blank(flavor_codes, flavors) & (quantity != 0)
+
+    # Sum quantities into a (school, flavor, shipping/pickup) cube
+    num_schools, num_flavors = len(schools), len(flavors)
+    keys = (school_codes[valid] * num_flavors + flavor_codes[valid]) * 2 + pickup[valid]
+    sums = np.bincount(keys, weights=quantity[valid], minlength=num_schools * num_flavors * 2)
+    cube = np.rint(sums).astype(np.int64).reshape(num_schools, num_flavors, 2)
+
+    schools_data = {}
+    for school_idx, flavor_idx in zip(*np.nonzero(cube.sum(axis=2))):
+        shipping, pickup_count = cube[school_idx, flavor_idx]
+        schools_data.setdefault(schools[school_idx], {})[flavors[flavor_idx]] = {
+            'pickup': int(pickup_count),
+            'shipping': int(shipping)
+        }
+
+    flavor_totals = cube.sum(axis=0)
+    all_flavors_data = {}
+    for flavor_idx in np.nonzero(flavor_totals.sum(axis=1))[0]:
+        shipping, pickup_count = flavor_totals[flavor_idx]
+        all_flavors_data[flavors[flavor_idx]] = {'pickup': int(pickup_count), 'shipping': int(shipping)}
+
+    grand_shipping, grand_pickup = flavor_totals.sum(axis=0) if num_flavors else (0, 0)
+    grand_totals = {'pickup': int(grand_pickup), 'shipping': int(grand_shipping)}
+
+    snapshot.cache['production_totals'] = (schools_data, all_flavors_data, grand_totals)
+    return snapshot.cache['production_totals']
+
+
+def student_sales_totals(snapshot):
+    """Sales ($) per school and student, in one pass
+
+    Returns {school: {student: {'grade', 'total'}}}, where grade is taken
+    from the student's first order line in that school.
+    """
+    if 'student_sales_totals' in snapshot.cache:
+        return snapshot.cache['student_sales_totals']
+
+    lines = get_order_lines(snapshot)
+    school_codes, schools = get_codes(snapshot, 'school')
+    student_codes, students = get_codes(snapshot, 'student')
+    line_total = np.asarray(lines.line_total, dtype=np.float64)
+
+    valid_rows = np.nonzero(_not_blank(school_codes, schools) & _not_blank(student_codes, students))[0]
+    keys = school_codes[valid_rows] * len(students) + student_codes[valid_rows]
+
+    # One group per (school, student); first_rows gives each group's first line
+    group_keys, first_positions, group_ids = np.unique(keys, return_index=True, return_inverse=True)
+    totals = np.bincount(group_ids.reshape(-1), weights=line_total[valid_rows], minlength=len(group_keys))
+    first_rows = valid_rows[first_positions]
+
+    schools_data = {}
+    # Visit groups in order of first appearance, like a row-by-row scan would
+    for group_idx in np.argsort(first_rows, kind='stable'):
+        key = group_keys[group_idx]
+        school = schools[key // len(students)]
+        student = students[key % len(students)]
+        schools_data.setdefault(school, {})[student] = {
+            'grade': lines.grade[first_rows[group_idx]],
+            'total': float(totals[group_idx])
+        }
+
+    snapshot.cache['student_sales_totals'] = schools_data
+    return schools_data
@@ -0,0 +1,202 @@
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from rate_limit import (
+    TokenBucket, should_retry, RETRY_STATUSES, SHEETS_REQUESTS_PER_MINUTE,
+    DOCS_WRITES_PER_MINUTE, DOCS_READS_PER_MINUTE, DRIVE_REQUESTS_PER_MINUTE
+)
+import bisect
+import contextvars
+import gspread
+import random
+import requests
+import threading
+import time
+
+MAX_RETRIES = 6
+MAX_BACKOFF = 64
+
+# Per-API budgets: (requests per minute, requests in flight at once)
+API_LIMITS = {
+    'sheets': (SHEETS_REQUESTS_PER_MINUTE, 4),
+    'docs': (DOCS_READS_PER_MINUTE, 8),
+    'docs_write': (DOCS_WRITES_PER_MINUTE, 8),
+    'drive': (DRIVE_REQUESTS_PER_MINUTE, 16)
+}
+
+# Latency histogram bucket upper bounds (seconds)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+# Network errors worth retrying, along with quota and 5xx responses
+NETWORK_ERRORS = (ConnectionError, TimeoutError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+# HTTP methods that can be sent twice safely. A POST (or PATCH) that failed
+# with a 5xx or a dropped connection may still have been applied, e.g. a
+# copied file or appended rows, so those are only retried on quota errors.
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+# Job making API calls in the current thread (dashboard jobs run side by side)
+_entry_point = contextvars.ContextVar('entry_point', default=None)
+
+
+class ApiBudget:
+    """Rate limit and in-flight limit for one API"""
+
+    def __init__(self, rate_per_minute, max_in_flight):
+        self.bucket = TokenBucket(rate_per_minute)
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+
+
+class ApiMetrics:
+    """Call counts, retries and latency histograms per entry point and API"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+        # For threads that didn't call set_entry_point
+        self.entry_point = 'other'
+
+    def record(self, api, seconds, retries, failed):
+        entry_point = _entry_point.get() or self.entry_point
+        with self.lock:
+            stats = self.stats.setdefault((entry_point, api), {
+                'calls': 0,
+                'retries': 0,
+                'errors': 0,
+                'seconds': 0.0,
+                'histogram': [0] * (len(LATENCY_BUCKETS) + 1)
+            })
+            stats['calls'] += 1
+            stats['retries'] += retries
+            stats['errors'] += 1 if failed else 0
+            stats['seconds'] += seconds
+            stats['histogram'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def report(self, entry_point=None):
+        """One line per API, e.g. "sheets: 12 calls, 1 retries, 0 errors, 3.4s total (avg 0.28s)" """
+        lines = []
+        with self.lock:
+            for (name, api), stats in sorted(self.stats.items()):
+                if entry_point and name != entry_point:
+                    continue
+                histogram = ", ".join(
+                    f"<={bound}s: {count}" for bound, count in zip(LATENCY_BUCKETS + ('inf',), stats['histogram']) if count
+                )
+                lines.append(
+                    f"{name} / {api}: {stats['calls']} calls, {stats['retries']} retries, {stats['errors']} errors, "
+                    f"{stats['seconds']:.1f}s total (avg {stats['seconds'] / stats['calls']:.2f}s; {histogram})"
+                )
+        return lines
+
+
+budgets = {api: ApiBudget(*limits) for api, limits in API_LIMITS.items()}
+metrics = ApiMetrics()
+
+
+def set_entry_point(name):
+    """Name the job making API calls from now on in this thread, for the metrics
+
+    Called from the main thread (a standalone script) it also names the
+    calls of threads that don't set their own, like the script's workers.
+    """
+    _entry_point.set(name)
+    if threading.current_thread() is threading.main_thread():
+        metrics.entry_point = name
+
+
+def is_quota_error(error):
+    """True for 429 responses and rate-limit 403s (the request wasn't applied)"""
+    if isinstance(error, HttpError):
+        content = error.content or b''
+        return error.resp.status == 429 or (error.resp.status == 403 and (b'rateLimitExceeded' in content or b'userRateLimitExceeded' in content))
+    if isinstance(error, APIError):
+        status = error.response.status_code
+        return status == 429 or (status == 403 and ('rateLimitExceeded' in error.response.text or 'userRateLimitExceeded' in error.response.text))
+    return False
+
+
+def is_retryable(error, idempotent=True):
+    """True for quota errors, plus 5xx responses and network errors if idempotent"""
+    if is_quota_error(error):
+        return True
+    if not idempotent:
+        return False
+    if isinstance(error, HttpError):
+        return should_retry(error)
+    if isinstance(error, APIError):
+        return error.response.status_code in RETRY_STATUSES
+    return isinstance(error, NETWORK_ERRORS)
+
+
+def call(api, fn, idempotent=True, cost=1):
+    """Run one API call within the API's budget, retrying with jittered backoff
+
+    Calls that change something each time they're sent (file copies,
+    appends, batch updates) must pass idempotent=False: they're only
+    retried when the API refused them for quota. A batch request counts
+    each call in it against the quota, so it passes that many as cost.
+    """
+    budget = budgets[api]
+    start = time.monotonic()
+    retries = 0
+
+    while True:
+        for _ in range(cost):
+            budget.bucket.acquire()
+        try:
+            with budget.in_flight:
+                result = fn()
+            metrics.record(api, time.monotonic() - start, retries, False)
+            return result
+        except Exception as e:
+            if not is_retryable(e, idempotent) or retries >= MAX_RETRIES:
+                metrics.record(api, time.monotonic() - start, retries, True)
+                raise
+            # Full jitter: anywhere up to the exponential backoff
+            retries += 1
+            time.sleep(random.uniform(0, min(MAX_BACKOFF, 2 ** retries)))
+
+
+def _api_for_method(method_id):
+    """Budget name for a googleapiclient method id like 'docs.documents.batchUpdate'"""
+    service = (method_id or '').split('.')[0]
+    if service == 'docs':
+        return 'docs' if method_id.endswith('.get') else 'docs_write'
+    return service if service in budgets else 'drive'
+
+
+class ResilientHttpRequest(HttpRequest):
+    """googleapiclient request that goes through call()"""
+
+    def execute(self, http=None, num_retries=0):
+        return call(
+            _api_for_method(self.methodId),
+            lambda: super(ResilientHttpRequest, self).execute(http=http),
+            idempotent=self.method.upper() in IDEMPOTENT_METHODS
+        )
+
+
+class ResilientHTTPClient(HTTPClient):
+    """gspread HTTP client that goes through call()"""
+
+    def request(self, method, endpoint, *args, **kwargs):
+        api = 'drive' if '/drive/' in endpoint else 'sheets'
+        return call(
+            api,
+            lambda: super(ResilientHTTPClient, self).request(method, endpoint, *args, **kwargs),
+            idempotent=method.upper() in IDEMPOTENT_METHODS
+        )
+
+
+def authorize(creds):
+    """gspread client with backoff, quota budgeting and metrics"""
+    return gspread.authorize(creds, http_client=ResilientHTTPClient)
+
+
+def build_service(service_name, version, creds=None, http=None):
+    """googleapiclient service with backoff, quota budgeting and metrics"""
+    if http is not None:
+        return build(service_name, version, http=http, requestBuilder=ResilientHttpRequest)
+    return build(service_name, version, credentials=creds, requestBuilder=ResilientHttpRequest)
@@ -1,5 +1,6 @@
 import streamlit as st
 import scripts
+import jobs
 import os
 from datetime import datetime
 
@@ -42,6 +43,58 @@ def check_password():
     else:
         return True
 
+# Jobs panel refresh interval while a job is queued or running (seconds)
+JOBS_REFRESH_SECONDS = 3
+ACTIVE_STATUSES = ('queued', 'running')
+
+def jobs_panel(auto_refresh):
+    """Jobs list with progress and downloads (run as a fragment, see below)"""
+    st.header("🗂️ Jobs")
+    
+    button_col1, button_col2 = st.columns(2)
+    with button_col1:
+        st.button("🔄 Refresh", use_container_width=True, key="refresh_jobs")
+    with button_col2:
+        if st.button("🧹 Clear Finished", use_container_width=True, key="clear_jobs"):
+            jobs.clear_finished()
+    
+    status_icons = {'queued': '⏳', 'running': '⚙️', 'done': '✅', 'failed': '❌'}
+    recent = jobs.recent_jobs()
+    
+    # Everything finished: a full rerun turns the timer off
+    if auto_refresh and not any(job['status'] in ACTIVE_STATUSES for job in recent):
+        st.rerun()
+    
+    if not recent:
+        st.info("No jobs yet. Jobs you start appear here with their progress.")
+    
+    for job in recent:
+        title = f"{status_icons.get(job['status'], '')} #{job['id']} {job['label']}"
+        if job['args'].get('school_name'):
+            title += f" - {job['args']['school_name']}"
+        if job['args'].get('full_refresh'):
+            title += " (full rebuild)"
+        
+        with st.expander(title, expanded=job['status'] == 'running'):
+            st.caption(f"{job['status'].capitalize()} · queued {job['created_at']}")
+            
+            if job['error']:
+                st.error(f"Error: {job['error']}")
+            
+            if job['result_file'] and os.path.exists(job['result_file']):
+                is_zip = job['result_file'].endswith('.zip')
+                with open(job['result_file'], 'rb') as f:
+                    st.download_button(
+                        label="📥 Download ZIP" if is_zip else "📥 Download PDF",
+                        data=f.read(),
+                        file_name=os.path.basename(job['result_file']),
+                        mime='application/zip' if is_zip else 'application/pdf',
+                        key=f"download_job_{job['id']}"
+                    )
+            
+            if job['output']:
+                st.text_area("Output:", job['output'], height=200, key=f"job_output_{job['id']}")
+
 # Main app
 if check_password():
     
@@ -59,12 +112,15 @@ if check_password():
         
         # Get list of schools from spreadsheet
         try:
-            import gspread
+            import api_client
+            import client_pool
+            api_client.set_entry_point('school_list')
+            # Credentials, client and spreadsheet are reused across reruns
             creds = scripts.get_credentials()
-            gc = gspread.authorize(creds)
-            spreadsheet = gc.open('MASTER SPRING 2026')
-            all_sheets = spreadsheet.worksheets()
-            school_sheets = [sheet.title.replace(' MASTER', '') for sheet in all_sheets if sheet.title.endswith(' MASTER') and sheet.title != 'MASTER']
+            gc = client_pool.gspread_client(creds)
+            spreadsheet = client_pool.open_spreadsheet(gc, 'MASTER SPRING 2026')
+            all_titles = client_pool.worksheet_titles(spreadsheet)
+            school_sheets = [title.replace(' MASTER', '') for title in all_titles if title.endswith(' MASTER') and title != 'MASTER']
             
             if school_sheets:
                 selected_school = st.selectbox(
@@ -73,30 +129,14 @@ if check_password():
                     key="school_selector"
                 )
                 
+                # Jobs run in the background; progress and downloads are under Jobs
                 if st.button("🖨️ Generate Order Forms", use_container_width=True, key="generate_forms"):
-                    with st.spinner(f"Generating order forms for {selected_school}..."):
-                        try:
-                            result, error, pdf_file = scripts.export_order_forms(selected_school)
-                            
-                            if error:
-                                st.error(f"Error: {error}")
-                            else:
-                                st.success(f"Order forms generated for {selected_school}!")
-                                
-                                if pdf_file and os.path.exists(pdf_file):
-                                    with open(pdf_file, 'rb') as f:
-                                        st.download_button(
-                                            label="📥 Download Order Forms PDF",
-                                            data=f.read(),
-                                            file_name=pdf_file,
-                                            mime='application/pdf',
-                                            key="download_forms_pdf"
-                                        )
-                            
-                            st.text_area("Output:", result, height=300)
-                            
-                        except Exception as e:
-                            st.error(f"Error: {str(e)}")
+                    job_id = jobs.submit('order_forms', school_name=selected_school)
+                    st.success(f"Order forms for {selected_school} queued (job #{job_id})")
+                
+                if st.button("🖨️ Generate Order Forms for All Schools", use_container_width=True, key="generate_all_forms"):
+                    job_id = jobs.submit('all_order_forms')
+                    st.success(f"Order forms for all {len(school_sheets)} schools queued (job #{job_id})")
             else:
                 st.warning("No school sheets found. Please run 'Update School Sheets' first.")
                 
@@ -107,52 +147,26 @@ if check_password():
         
         # Update School Sheets
         if st.button("📊 Update School Sheets", use_container_width=True, key="update_sheets"):
-            with st.spinner("Organizing school data..."):
-                try:
-                    result, error = scripts.organize_schools()
-                    
-                    if error:
-                        st.error(f"Error: {error}")
-                    else:
-                        st.success("School sheets updated successfully!")
-                    
-                    st.text_area("Output:", result, height=300)
-                    
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+            job_id = jobs.submit('organize_schools')
+            st.success(f"School sheet update queued (job #{job_id})")
+        
+        # Updates only add new MASTER rows; after editing or re-sorting MASTER, rebuild everything
+        if st.button("🔁 Rebuild All School Sheets", use_container_width=True, key="rebuild_sheets",
+                     help="Use after editing, inserting or deleting rows in MASTER"):
+            job_id = jobs.submit('organize_schools', full_refresh=True)
+            st.success(f"Full school sheet rebuild queued (job #{job_id})")
         
         st.markdown("---")
         
         # Generate Production Report
         if st.button("📦 Generate Production Report", use_container_width=True, key="prod_report"):
-            with st.spinner("Creating production report..."):
-                try:
-                    result, error, pdf_file = scripts.create_production_report()
-                    
-                    if error:
-                        st.error(f"Error: {error}")
-                    else:
-                        st.success("Production report created!")
-                        
-                        if pdf_file and os.path.exists(pdf_file):
-                            with open(pdf_file, 'rb') as f:
-                                st.download_button(
-                                    label="📥 Download PDF Report",
-                                    data=f.read(),
-                                    file_name=pdf_file,
-                                    mime='application/pdf',
-                                    key="download_prod_pdf"
-                                )
-                    
-                    st.text_area("Output:", result, height=300)
-                    
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+            job_id = jobs.submit('production_report')
+            st.success(f"Production report queued (job #{job_id})")
     
     with col2:
-        st.header("📈 Reports & Analytics")
-        
-        st.info("More features coming soon!")
+        # Only the Jobs panel reruns on the timer, and only while jobs are active
+        auto_refresh = any(job['status'] in ACTIVE_STATUSES for job in jobs.recent_jobs())
+        st.fragment(jobs_panel, run_every=JOBS_REFRESH_SECONDS if auto_refresh else None)(auto_refresh)
     
     # Footer
     st.markdown("---")
@@ -172,5 +186,13 @@ if check_password():
         All files are saved to Google Drive.
         """)
         
+        st.markdown("---")
+        
+        # API calls, retries and latency since the app started
+        with st.expander("📡 API usage"):
+            import api_client
+            usage = api_client.metrics.report()
+            st.text("\n".join(usage) if usage else "No API calls yet")
+        
         st.markdown("---")
         st.markdown("**Need help?** Contact the administrator")
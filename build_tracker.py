@@ -0,0 +1,159 @@
+from master_snapshot import CACHE_DIR, replace_file
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import time
+
+# Artifacts tracked per school
+LEADERBOARD = 'leaderboard'
+SCHOOL_SHEET = 'school_sheet'
+PRODUCTION_REPORT = 'production_report'
+PRODUCTION_SHEET = 'production_sheet'  # the standalone report: PDF and 'Production' sheet
+ORDER_FORMS = 'order_forms'
+
+# A lock file older than this was left behind by a crashed run (seconds)
+STALE_LOCK_SECONDS = 60
+
+
+def _state_path(spreadsheet_id):
+    return os.path.join(CACHE_DIR, f"builds_{spreadsheet_id}.json")
+
+
+def _load(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+@contextmanager
+def _locked(path):
+    """Hold path + '.lock' (created exclusively, so one process at a time)"""
+    lock_path = path + '.lock'
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue  # released meanwhile
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(lock_path)
+
+
+def _add_row(digest, row):
+    digest.update('\x1f'.join(row).encode('utf-8'))
+    digest.update(b'\x1e')
+
+
+def school_digests(schools, rows, salt=''):
+    """Hash of each school's rows, in one pass
+
+    schools and rows are parallel (e.g. lines.school and lines.source_rows).
+    salt is mixed into every hash, so changing it (say, to a template's
+    checksum) makes every artifact stale.
+    """
+    hashes = {}
+    for school, row in zip(schools, rows):
+        if not school:
+            continue
+        if school not in hashes:
+            hashes[school] = hashlib.sha1(salt.encode('utf-8'))
+        _add_row(hashes[school], row)
+    return {school: digest.hexdigest() for school, digest in hashes.items()}
+
+
+def rows_digest(rows, salt=''):
+    """Hash of one school's rows (e.g. a school sheet's values)"""
+    digest = hashlib.sha1(salt.encode('utf-8'))
+    for row in rows:
+        _add_row(digest, row)
+    return digest.hexdigest()
+
+
+class BuildTracker:
+    """Which data each school's artifacts were last built from
+
+    Records {artifact: {school: {'digest', 'file'}}} in the local cache, so
+    a run only rebuilds artifacts whose school data changed (or whose file
+    is gone). Several scripts and dashboard jobs share the file, so save()
+    only writes back this tracker's own changes.
+    """
+
+    def __init__(self, spreadsheet_id):
+        self.spreadsheet_id = spreadsheet_id
+        self.builds = _load(_state_path(spreadsheet_id))
+        self.changes = {}  # {artifact: {school: build, or None if forgotten}}
+
+    def save(self):
+        """Merge this tracker's records into the file, under a lock file
+
+        Re-reads the file first, so records saved by another run since this
+        tracker was created are kept.
+        """
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _state_path(self.spreadsheet_id)
+        with _locked(path):
+            builds = _load(path)
+            for artifact, schools in self.changes.items():
+                artifact_builds = builds.setdefault(artifact, {})
+                for school, build in schools.items():
+                    if build is None:
+                        artifact_builds.pop(school, None)
+                    else:
+                        artifact_builds[school] = build
+
+            with replace_file(path) as f:
+                json.dump(builds, f, indent=2)
+
+        self.builds = builds
+        self.changes = {}
+
+    def is_fresh(self, artifact, school, digest):
+        """True if the school's artifact was built from this digest (and its file still exists)"""
+        build = self.builds.get(artifact, {}).get(school)
+        if not build or build['digest'] != digest:
+            return False
+        return not build.get('file') or os.path.exists(build['file'])
+
+    def stale(self, artifact, digests):
+        """Schools (from {school: digest}) whose artifact needs rebuilding"""
+        return [school for school, digest in digests.items() if not self.is_fresh(artifact, school, digest)]
+
+    def file(self, artifact, school):
+        """File recorded for a school's artifact, or None"""
+        build = self.builds.get(artifact, {}).get(school)
+        return build.get('file') if build else None
+
+    def shared_file(self, artifact, digests):
+        """For an artifact covering every school in one file: that file if it was
+        built from exactly these schools' data and still exists, else None"""
+        builds = self.builds.get(artifact, {})
+        if not digests or set(builds) != set(digests) or self.stale(artifact, digests):
+            return None
+        files = {build['file'] for build in builds.values()}
+        return files.pop() if len(files) == 1 else None
+
+    def record(self, artifact, school, digest, file=None):
+        """Note that a school's artifact was built from digest (call save() after)"""
+        build = {'digest': digest, 'file': file}
+        self.builds.setdefault(artifact, {})[school] = build
+        self.changes.setdefault(artifact, {})[school] = build
+
+    def forget_missing(self, artifact, schools):
+        """Drop records for schools that are no longer in the data"""
+        builds = self.builds.get(artifact, {})
+        for school in list(builds):
+            if school not in schools:
+                del builds[school]
+                self.changes.setdefault(artifact, {})[school] = None
@@ -0,0 +1,108 @@
+from api_client import authorize, build_service
+from google.auth.transport.requests import Request
+from datetime import datetime, timezone
+import contextlib
+import threading
+import time
+
+# Refresh the access token this long before it expires
+REFRESH_MARGIN = 300
+REFRESH_CHECK_INTERVAL = 60
+
+# How long a spreadsheet's list of sheet titles is reused
+WORKSHEET_TITLES_MAX_AGE = 60
+
+# Shared by every Streamlit rerun and button handler in this process
+_lock = threading.RLock()
+_credentials = None
+_gspread_client = None
+_spreadsheets = {}
+_worksheet_titles = {}
+_idle_services = {}
+_refresher = None
+
+
+def _needs_refresh(creds):
+    if not creds.token or creds.expiry is None:
+        return True
+    # google-auth keeps expiry as a naive UTC datetime
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return (creds.expiry - now).total_seconds() < REFRESH_MARGIN
+
+
+def _refresh_loop():
+    while True:
+        time.sleep(REFRESH_CHECK_INTERVAL)
+        try:
+            creds = _credentials
+            if creds is not None and _needs_refresh(creds):
+                creds.refresh(Request())
+        except Exception:
+            # Calls refresh the token themselves if this fails
+            pass
+
+
+def credentials(loader):
+    """Credentials from loader(), loaded once per process and kept fresh in the background"""
+    global _credentials, _refresher
+    with _lock:
+        if _credentials is None:
+            _credentials = loader()
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_loop, name='token-refresher', daemon=True)
+            _refresher.start()
+        return _credentials
+
+
+def gspread_client(creds):
+    """The process's authorized gspread client"""
+    global _gspread_client
+    with _lock:
+        if _gspread_client is None or _gspread_client.http_client.auth is not creds:
+            _gspread_client = authorize(creds)
+        return _gspread_client
+
+
+def open_spreadsheet(gc, name):
+    """Spreadsheet handle by name, opened once per process"""
+    with _lock:
+        if name not in _spreadsheets:
+            _spreadsheets[name] = gc.open(name)
+        return _spreadsheets[name]
+
+
+def worksheet_titles(spreadsheet, max_age=WORKSHEET_TITLES_MAX_AGE):
+    """Titles of a spreadsheet's sheets, refetched at most every max_age seconds"""
+    with _lock:
+        cached = _worksheet_titles.get(spreadsheet.id)
+        if cached and time.monotonic() - cached[0] < max_age:
+            return cached[1]
+
+    titles = [sheet.title for sheet in spreadsheet.worksheets()]
+    with _lock:
+        _worksheet_titles[spreadsheet.id] = (time.monotonic(), titles)
+    return titles
+
+
+def forget_worksheet_titles(spreadsheet):
+    """Call after adding or removing sheets so the next lookup refetches"""
+    with _lock:
+        _worksheet_titles.pop(spreadsheet.id, None)
+
+
+@contextlib.contextmanager
+def service(creds, service_name, version):
+    """Borrow a built googleapiclient service (they aren't thread-safe, so one user at a time)"""
+    key = (service_name, version, id(creds))
+    with _lock:
+        idle = _idle_services.setdefault(key, [])
+        borrowed = idle.pop() if idle else None
+
+    if borrowed is None:
+        borrowed = build_service(service_name, version, creds)
+
+    try:
+        yield borrowed
+    finally:
+        with _lock:
+            _idle_services[key].append(borrowed)
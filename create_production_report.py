@@ -10,6 +10,12 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from datetime import datetime
+from master_snapshot import load_master_snapshot
+from api_client import authorize, set_entry_point
+from aggregation import production_totals
+from order_lines import get_order_lines
+from build_tracker import BuildTracker, PRODUCTION_SHEET, school_digests
+from sheets_batch import SheetsBatch
 
 # Set up OAuth credentials
 SCOPES = [
@@ -17,6 +23,54 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive'
 ]
 
+# Production sheet formats
+SCHOOL_HEADER_FORMAT = {
+    'backgroundColor': {'red': 0.3, 'green': 0.5, 'blue': 0.8},
+    'textFormat': {
+        'foregroundColor': {'red': 1, 'green': 1, 'blue': 1},
+        'bold': True,
+        'fontSize': 14
+    }
+}
+
+COLUMN_HEADER_FORMAT = {
+    'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9},
+    'textFormat': {'bold': True},
+    'horizontalAlignment': 'CENTER'
+}
+
+SCHOOL_TOTAL_FORMAT = {
+    'backgroundColor': {'red': 1, 'green': 1, 'blue': 0.8},
+    'textFormat': {'bold': True}
+}
+
+COMBINED_HEADER_FORMAT = {
+    'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 0.2},
+    'textFormat': {
+        'foregroundColor': {'red': 1, 'green': 1, 'blue': 1},
+        'bold': True,
+        'fontSize': 14
+    }
+}
+
+COMBINED_COLUMN_HEADER_FORMAT = {
+    'backgroundColor': {'red': 0.2, 'green': 0.2, 'blue': 0.2},
+    'textFormat': {
+        'foregroundColor': {'red': 1, 'green': 1, 'blue': 1},
+        'bold': True
+    },
+    'horizontalAlignment': 'CENTER'
+}
+
+GRAND_TOTAL_FORMAT = {
+    'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 0.2},
+    'textFormat': {
+        'foregroundColor': {'red': 1, 'green': 1, 'blue': 1},
+        'bold': True,
+        'fontSize': 12
+    }
+}
+
 def get_credentials():
     creds = None
     if os.path.exists('token.pickle'):
@@ -40,71 +94,41 @@ creds = get_credentials()
 print("Authentication successful!")
 
 # Connect to Google Sheets
-gc = gspread.authorize(creds)
+set_entry_point('create_production_report')
+gc = authorize(creds)
 
 # Open spreadsheet
 spreadsheet = gc.open('MASTER SPRING 2026')
-master_sheet = spreadsheet.worksheet('MASTER')
 
-print(f"Reading MASTER sheet...")
-
-# Get all data
-data = master_sheet.get_all_values()
-rows = data[1:]
+# Get all data (downloaded only if the sheet changed since the last run)
+snapshot = load_master_snapshot(spreadsheet, creds, print)
+rows = snapshot.rows
 
 print(f"Found {len(rows)} rows")
 
-# Column indices
-col_quantity = 16     # Column Q
-col_flavor = 17       # Column R
-col_delivery = 14     # Column O
-col_school = 47       # Column AV
+# The PDF and the Production sheet cover every school, so they're only
+# rebuilt when some school's rows changed (or the sheet was deleted)
+lines = get_order_lines(snapshot)
+tracker = BuildTracker(spreadsheet.id)
+digests = school_digests(lines.school, lines.source_rows)
+previous_report = tracker.shared_file(PRODUCTION_SHEET, digests)
+batch = SheetsBatch(spreadsheet)
+
+if previous_report and batch.has_sheet('Production'):
+    print(f"\n✅ No orders changed since the last report: {previous_report}")
+    print("Production sheet is up to date")
+    exit()
 
 # Data structure: {school: {flavor: {pickup: count, shipping: count}}}
-schools_data = {}
-all_flavors_data = {}  # For combined totals
-
-for row in rows:
-    if len(row) > col_school:
-        school = row[col_school].strip()
-        flavor = row[col_flavor].strip()
-        delivery = row[col_delivery].strip()
-        
-        try:
-            quantity = int(row[col_quantity]) if row[col_quantity].isdigit() else 0
-        except:
-            quantity = 0
-        
-        if not school or not flavor or quantity == 0:
-            continue
-        
-        # Normalize delivery method
-        if 'pick' in delivery.lower():
-            delivery_type = 'pickup'
-        else:
-            delivery_type = 'shipping'
-        
-        # Track by school
-        if school not in schools_data:
-            schools_data[school] = {}
-        
-        if flavor not in schools_data[school]:
-            schools_data[school][flavor] = {'pickup': 0, 'shipping': 0}
-        
-        schools_data[school][flavor][delivery_type] += quantity
-        
-        # Track combined totals
-        if flavor not in all_flavors_data:
-            all_flavors_data[flavor] = {'pickup': 0, 'shipping': 0}
-        
-        all_flavors_data[flavor][delivery_type] += quantity
+# plus combined per-flavor totals, computed in one vectorized pass
+schools_data, all_flavors_data, grand_totals = production_totals(snapshot)
 
 print(f"\nFound {len(schools_data)} schools")
 print(f"Found {len(all_flavors_data)} unique flavors")
 
 # Calculate grand totals
-grand_pickup_total = sum(f['pickup'] for f in all_flavors_data.values())
-grand_shipping_total = sum(f['shipping'] for f in all_flavors_data.values())
+grand_pickup_total = grand_totals['pickup']
+grand_shipping_total = grand_totals['shipping']
 
 # Create PDF
 print("\nCreating PDF report...")
@@ -221,19 +245,26 @@ story.append(combined_table)
 doc.build(story)
 print(f"PDF created: {pdf_filename}")
 
-# Create or clear Production sheet in Google Sheets
+# Build the Production sheet: values and formatting are planned together and
+# sent in one batchUpdate plus one values write (then a column resize)
 print("\nUpdating Google Sheet...")
 
-try:
-    production_sheet = spreadsheet.worksheet('Production')
+if batch.has_sheet('Production'):
     print("  Found existing 'Production' sheet - clearing it...")
-    production_sheet.clear()
-except:
+    # Values and formatting from the last report (its rows were in other places)
+    batch.add_request({
+        'updateCells': {
+            'range': {'sheetId': batch.sheet_id('Production')},
+            'fields': 'userEnteredValue,userEnteredFormat'
+        }
+    })
+else:
     print("  Creating new 'Production' sheet...")
-    production_sheet = spreadsheet.add_worksheet(title='Production', rows=1000, cols=10)
+    batch.add_sheet('Production', rows=1000, cols=10)
 
-# Build the sheet data
+# Build the sheet data, noting where each formatted row lands
 sheet_data = []
+formats = []  # (A1 range, format)
 
 # Add each school's table
 for school_name in sorted(schools_data.keys()):
@@ -241,7 +272,9 @@ for school_name in sorted(schools_data.keys()):
     
     # School header
     sheet_data.append([school_name])
+    formats.append((f'A{len(sheet_data)}', SCHOOL_HEADER_FORMAT))
     sheet_data.append(['Flavor', 'Pick-up', 'Shipping'])
+    formats.append((f'A{len(sheet_data)}:C{len(sheet_data)}', COLUMN_HEADER_FORMAT))
     
     school_pickup_total = 0
     school_shipping_total = 0
@@ -258,13 +291,16 @@ for school_name in sorted(schools_data.keys()):
     
     # School totals
     sheet_data.append(['TOTAL', school_pickup_total, school_shipping_total])
+    formats.append((f'A{len(sheet_data)}:C{len(sheet_data)}', SCHOOL_TOTAL_FORMAT))
     
     # Blank row between schools
     sheet_data.append([])
 
 # Add combined totals table
 sheet_data.append(['ALL SCHOOLS - TOTAL PRODUCTION NEEDED'])
+formats.append((f'A{len(sheet_data)}', COMBINED_HEADER_FORMAT))
 sheet_data.append(['Flavor', 'Pick-up', 'Shipping', 'TOTAL'])
+formats.append((f'A{len(sheet_data)}:D{len(sheet_data)}', COMBINED_COLUMN_HEADER_FORMAT))
 
 for flavor in sorted(all_flavors_data.keys()):
     pickup = all_flavors_data[flavor]['pickup']
@@ -275,86 +311,37 @@ for flavor in sorted(all_flavors_data.keys()):
 
 # Grand totals
 sheet_data.append(['GRAND TOTAL', grand_pickup_total, grand_shipping_total, grand_pickup_total + grand_shipping_total])
+formats.append((f'A{len(sheet_data)}:D{len(sheet_data)}', GRAND_TOTAL_FORMAT))
 
-# Write all data to sheet
-production_sheet.update(values=sheet_data, range_name='A1')
+batch.write_rows('Production', 1, sheet_data)
 
-# Format the sheet
-print("\nFormatting Production sheet...")
+print(f"\nFormatting Production sheet ({len(formats)} ranges)...")
 
-row_index = 1
+for range_name, cell_format in formats:
+    batch.format('Production', range_name, cell_format)
 
-for school_name in sorted(schools_data.keys()):
-    # Format school header
-    production_sheet.format(f'A{row_index}', {
-        'backgroundColor': {'red': 0.3, 'green': 0.5, 'blue': 0.8},
-        'textFormat': {
-            'foregroundColor': {'red': 1, 'green': 1, 'blue': 1},
-            'bold': True,
-            'fontSize': 14
-        }
-    })
-    
-    row_index += 1
-    
-    # Format column headers
-    production_sheet.format(f'A{row_index}:C{row_index}', {
-        'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9},
-        'textFormat': {'bold': True},
-        'horizontalAlignment': 'CENTER'
-    })
-    
-    row_index += 1
-    
-    # Flavor rows
-    num_flavors = len(schools_data[school_name])
-    row_index += num_flavors
-    
-    # Format totals row
-    production_sheet.format(f'A{row_index}:C{row_index}', {
-        'backgroundColor': {'red': 1, 'green': 1, 'blue': 0.8},
-        'textFormat': {'bold': True}
-    })
-    
-    row_index += 2
+calls = batch.execute()
 
-# Format combined totals section
-# Header
-production_sheet.format(f'A{row_index}', {
-    'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 0.2},
-    'textFormat': {
-        'foregroundColor': {'red': 1, 'green': 1, 'blue': 1},
-        'bold': True,
-        'fontSize': 14
+# Auto-resize columns (after the values are in)
+batch.add_request({
+    'autoResizeDimensions': {
+        'dimensions': {
+            'sheetId': batch.sheet_id('Production'),
+            'dimension': 'COLUMNS',
+            'startIndex': 0,
+            'endIndex': 4
+        }
     }
 })
 
-row_index += 1
-
-# Column headers
-production_sheet.format(f'A{row_index}:D{row_index}', {
-    'backgroundColor': {'red': 0.2, 'green': 0.2, 'blue': 0.2},
-    'textFormat': {
-        'foregroundColor': {'red': 1, 'green': 1, 'blue': 1},
-        'bold': True
-    },
-    'horizontalAlignment': 'CENTER'
-})
-
-row_index += len(all_flavors_data) + 1
-
-# Grand total row
-production_sheet.format(f'A{row_index}:D{row_index}', {
-    'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 0.2},
-    'textFormat': {
-        'foregroundColor': {'red': 1, 'green': 1, 'blue': 1},
-        'bold': True,
-        'fontSize': 12
-    }
-})
+calls += batch.execute()
+print(f"  ✓ Sent the Production sheet in {calls} requests")
 
-# Auto-resize columns
-production_sheet.columns_auto_resize(0, 3)
+# Remember which data this report was built from
+for school_name, digest in digests.items():
+    tracker.record(PRODUCTION_SHEET, school_name, digest, pdf_filename)
+tracker.forget_missing(PRODUCTION_SHEET, digests)
+tracker.save()
 
 print(f"\nCOMPLETE!")
 print(f"\nProduction report created:")
@@ -0,0 +1,352 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+import multiprocessing
+from master_snapshot import CACHE_DIR, replace_file
+from name_matching import similar_names, MIN_SIMILARITY
+import json
+import os
+import re
+
+# Columns of the 'Error Log' sheet; every issue is a row like this
+ISSUE_HEADER = ['Error Type', 'School', 'Student Name', 'Details', 'Suggestion']
+
+# Below this many students in total, school rules run in this process
+# (starting worker processes would take longer than the checks)
+PARALLEL_MIN_STUDENTS = 2000
+
+# Worker processes are forked: the standalone scripts run at import time, so
+# spawned workers would run the whole script again. Where fork isn't
+# available (Windows) school rules run in this process.
+FORK_AVAILABLE = 'fork' in multiprocessing.get_all_start_methods()
+
+# Grades as they're written on order forms: K, TK, Pre-K, Kindergarten,
+# 3, 3rd, 3rd Grade, Grade 3, Gr. 3, and combined classes like 3rd-4th or K/1
+GRADE = r'(k|tk|pk|pre-?k|(transitional )?kinder\w*|\d{1,2}(st|nd|rd|th)?)'
+GRADE_WORD = r'(grade|gr\.?)'
+VALID_GRADE = re.compile(
+    rf'^({GRADE_WORD} ?)?{GRADE}( ?(-|/|&|,|and) ?({GRADE_WORD} ?)?{GRADE})*( {GRADE_WORD}s?)?$',
+    re.IGNORECASE
+)
+
+# Registered rules in run order: (kind, title, function)
+#   'line':    fn(scan, idx) -> issue row or None, for every order line
+#   'student': fn(scan, student_name, data) -> issue row or None, for every student
+#   'school':  fn(school_name, students, saved) -> (issue rows, state to save),
+#              for every school (runs in worker processes, so it only gets
+#              that school's {student_name: order_line_count} and what it
+#              saved for the school last scan, or None)
+RULES = []
+
+
+def _register(kind, title):
+    def decorator(fn):
+        RULES.append((kind, title, fn))
+        return fn
+    return decorator
+
+
+def line_rule(title):
+    """Register a check run on every order line"""
+    return _register('line', title)
+
+
+def student_rule(title):
+    """Register a check run on every student's combined data"""
+    return _register('student', title)
+
+
+def school_rule(title):
+    """Register a check run on each school's students, in a worker process"""
+    return _register('school', title)
+
+
+class ScanData:
+    """Everything the rules look at, collected in one pass over the order lines"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.schools_students = {}  # {school: {student_name: count}}
+        self.all_students = {}  # {student_name: {schools: set(), grades: set(), teachers: set()}}
+        self.flavor_lines = Counter()  # {flavor: number of lines}
+        self.flavor_prices = {}  # {flavor: Counter(price)}
+        self.orders = {}  # {order_number: {'first_line': idx, 'schools': set()}}
+
+        for idx in range(len(lines)):
+            school = lines.school[idx]
+            student = lines.student[idx]
+            flavor = lines.flavor[idx]
+            order_number = lines.order_number[idx]
+
+            if flavor:
+                self.flavor_lines[flavor] += 1
+                if lines.quantity[idx] and lines.price[idx]:
+                    self.flavor_prices.setdefault(flavor, Counter())[lines.price[idx]] += 1
+
+            if order_number:
+                order = self.orders.setdefault(order_number, {'first_line': idx, 'schools': set()})
+                if school:
+                    order['schools'].add(school)
+
+            if not school or not student:
+                continue
+
+            students = self.schools_students.setdefault(school, {})
+            students[student] = students.get(student, 0) + 1
+
+            data = self.all_students.setdefault(student, {'schools': set(), 'grades': set(), 'teachers': set()})
+            data['schools'].add(school)
+            if lines.grade[idx]:
+                data['grades'].add(lines.grade[idx])
+            if lines.teacher[idx]:
+                data['teachers'].add(lines.teacher[idx])
+
+        # Most common price of each flavor
+        self.usual_price = {flavor: prices.most_common(1)[0][0] for flavor, prices in self.flavor_prices.items()}
+
+
+def _cache_path(spreadsheet_id):
+    return os.path.join(CACHE_DIR, f"data_checks_{spreadsheet_id}.json")
+
+
+def load_check_cache(spreadsheet_id):
+    """What the school rules saved last scan, {school: {rule name: state}}"""
+    try:
+        with open(_cache_path(spreadsheet_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_check_cache(spreadsheet_id, cache):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with replace_file(_cache_path(spreadsheet_id)) as f:
+        json.dump(cache, f)
+
+
+def _check_school(job):
+    """Worker: run the school rules on one school, returns [(rule_idx, issues, state)]"""
+    rules, school_name, students, saved = job
+    results = []
+    for rule_idx, fn in rules:
+        issues, state = fn(school_name, students, saved.get(fn.__name__))
+        results.append((rule_idx, issues, state))
+    return results
+
+
+def run_checks(scan, max_workers=None, cache=None):
+    """Run every registered rule, returns [(title, issue rows)] in registration order
+
+    Line and student rules share a single loop each; school rules are
+    split across a process pool by school. With a cache (see
+    load_check_cache, updated in place) school rules get back what they
+    saved for the school last scan, so they only redo work for what changed.
+    """
+    issues = [[] for _ in RULES]
+    line_rules = [(rule_idx, fn) for rule_idx, (kind, _, fn) in enumerate(RULES) if kind == 'line']
+    student_rules = [(rule_idx, fn) for rule_idx, (kind, _, fn) in enumerate(RULES) if kind == 'student']
+    school_rules = [(rule_idx, fn) for rule_idx, (kind, _, fn) in enumerate(RULES) if kind == 'school']
+
+    for student_name, data in scan.all_students.items():
+        for rule_idx, fn in student_rules:
+            issue = fn(scan, student_name, data)
+            if issue:
+                issues[rule_idx].append(issue)
+
+    if school_rules:
+        cache = {} if cache is None else cache
+        jobs = [
+            (school_rules, school_name, students, cache.get(school_name, {}))
+            for school_name, students in scan.schools_students.items()
+        ]
+
+        if len(jobs) < 2 or len(scan.all_students) < PARALLEL_MIN_STUDENTS or max_workers == 1 or not FORK_AVAILABLE:
+            results = list(map(_check_school, jobs))
+        else:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+                results = list(executor.map(_check_school, jobs))
+
+        # Every school's issues in school order
+        cache.clear()
+        for (_, school_name, _, _), school_results in zip(jobs, results):
+            cache[school_name] = {}
+            for rule_idx, school_issues, state in school_results:
+                issues[rule_idx].extend(school_issues)
+                cache[school_name][RULES[rule_idx][2].__name__] = state
+
+    for idx in range(len(scan.lines)):
+        for rule_idx, fn in line_rules:
+            issue = fn(scan, idx)
+            if issue:
+                issues[rule_idx].append(issue)
+
+    return [(title, rule_issues) for (_, title, _), rule_issues in zip(RULES, issues)]
+
+
+def _line_location(scan, idx):
+    return f"Row {scan.lines.row_numbers[idx]}"
+
+
+@student_rule("Checking for missing last names...")
+def missing_last_name(scan, student_name, data):
+    if ' ' not in student_name.strip():
+        # Only one word - missing last name
+        return [
+            'Missing Last Name',
+            ', '.join(sorted(data['schools'])),
+            student_name,
+            'Student name has only one word',
+            'Add last name or verify if correct'
+        ]
+
+
+@student_rule("Checking for students in multiple schools...")
+def multiple_schools(scan, student_name, data):
+    if len(data['schools']) > 1:
+        return [
+            'Multiple Schools',
+            ', '.join(sorted(data['schools'])),
+            student_name,
+            f"Appears in {len(data['schools'])} schools",
+            'Verify correct school and remove duplicates'
+        ]
+
+
+@student_rule("Checking for students with multiple grades...")
+def multiple_grades(scan, student_name, data):
+    if len(data['grades']) > 1:
+        return [
+            'Multiple Grades',
+            ', '.join(sorted(data['schools'])),
+            student_name,
+            f"Listed as: {', '.join(sorted(data['grades']))}",
+            'Verify correct grade'
+        ]
+
+
+@student_rule("Checking for students with multiple teachers...")
+def multiple_teachers(scan, student_name, data):
+    if len(data['teachers']) > 1:
+        return [
+            'Multiple Teachers',
+            ', '.join(sorted(data['schools'])),
+            student_name,
+            f"Listed with: {', '.join(sorted(data['teachers']))}",
+            'Verify correct teacher'
+        ]
+
+
+@school_rule("Checking for similar names (possible typos)...")
+def similar_student_names(school_name, students, saved):
+    student_list = list(students.items())
+    names = [name for name, count in student_list]
+    issues = []
+
+    # Similarity 70-99% (not an exact match), only comparing names likely to
+    # be close; pairs of names already compared last scan reuse that result
+    if saved and saved['min_similarity'] == MIN_SIMILARITY:
+        matches = similar_names(names, compared=saved['names'], matches=saved['matches'])
+    else:
+        matches = similar_names(names)
+
+    for i, j, similarity in matches:
+        name1, count1 = student_list[i]
+        name2, count2 = student_list[j]
+
+        # Suggest which name to keep (the one with more orders)
+        if count1 >= count2:
+            suggestion = f"Keep '{name1}' ({count1} orders), merge '{name2}' ({count2} orders)"
+        else:
+            suggestion = f"Keep '{name2}' ({count2} orders), merge '{name1}' ({count1} orders)"
+
+        issues.append([
+            'Similar Names',
+            school_name,
+            f"{name1} / {name2}",
+            f"{similarity}% similar",
+            suggestion
+        ])
+
+    saved = {
+        'min_similarity': MIN_SIMILARITY,
+        'names': names,
+        'matches': [[names[i], names[j], similarity] for i, j, similarity in matches]
+    }
+    return issues, saved
+
+
+@student_rule("Checking for invalid grades...")
+def invalid_grade(scan, student_name, data):
+    invalid = sorted(grade for grade in data['grades'] if not VALID_GRADE.match(grade.strip()))
+    if invalid:
+        return [
+            'Invalid Grade',
+            ', '.join(sorted(data['schools'])),
+            student_name,
+            f"Listed as: {', '.join(repr(grade) for grade in invalid)}",
+            'Use K or a grade number'
+        ]
+
+
+@line_rule("Checking for unknown flavors...")
+def unknown_flavor(scan, idx):
+    flavor = scan.lines.flavor[idx]
+    if not flavor and scan.lines.quantity[idx]:
+        details = f"{_line_location(scan, idx)}: no flavor"
+    elif flavor and scan.flavor_lines[flavor] == 1 and len(scan.flavor_lines) > 1:
+        # A flavor name no other line uses is usually a typo or a renamed product
+        details = f"{_line_location(scan, idx)}: '{flavor}' isn't on any other order"
+    else:
+        return None
+    return [
+        'Unknown Flavor',
+        scan.lines.school[idx],
+        scan.lines.student[idx],
+        details,
+        'Verify the product name'
+    ]
+
+
+@line_rule("Checking for non-numeric quantities...")
+def non_numeric_quantity(scan, idx):
+    value = scan.lines.raw('quantity', idx).strip()
+    if (value or scan.lines.flavor[idx]) and not value.isdigit():
+        return [
+            'Invalid Quantity',
+            scan.lines.school[idx],
+            scan.lines.student[idx],
+            f"{_line_location(scan, idx)}: quantity '{value}'",
+            'Enter a whole number of bags'
+        ]
+
+
+@line_rule("Checking for price mismatches...")
+def price_mismatch(scan, idx):
+    flavor = scan.lines.flavor[idx]
+    price = scan.lines.price[idx]
+    usual_price = scan.usual_price.get(flavor)
+    if usual_price is not None and price and price != usual_price:
+        return [
+            'Price Mismatch',
+            scan.lines.school[idx],
+            scan.lines.student[idx],
+            f"{_line_location(scan, idx)}: {flavor} at ${price:.2f}",
+            f"Usual price is ${usual_price:.2f}"
+        ]
+
+
+@line_rule("Checking for orders without a school...")
+def orphan_order(scan, idx):
+    order_number = scan.lines.order_number[idx]
+    if not order_number:
+        return None
+    order = scan.orders[order_number]
+    # Reported once, on the order's first line
+    if order['first_line'] == idx and not order['schools']:
+        return [
+            'Orphan Order',
+            '',
+            scan.lines.student[idx] or scan.lines.billing_name[idx],
+            f"{_line_location(scan, idx)}: order {order_number} has no school",
+            'Add the school so the order is included in reports'
+        ]
@@ -0,0 +1,147 @@
+from master_snapshot import CACHE_DIR, replace_file
+from googleapiclient.http import MediaIoBaseDownload
+import gzip
+import io
+import os
+import pickle
+import re
+
+DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# {{Placeholder}} markers in the order form template
+PLACEHOLDER = re.compile(r'\{\{[^{}]+\}\}')
+
+
+def _iter_paragraphs(doc):
+    """Every paragraph in the body and in table cells, with its path"""
+    for paragraph_idx, paragraph in enumerate(doc.paragraphs):
+        yield ('body', paragraph_idx), paragraph
+
+    for table_idx, table in enumerate(doc.tables):
+        for row_idx, row in enumerate(table.rows):
+            seen_cells = set()
+            for cell_idx, cell in enumerate(row.cells):
+                # Merged cells show up once per grid column
+                if id(cell._tc) in seen_cells:
+                    continue
+                seen_cells.add(id(cell._tc))
+                for paragraph_idx, paragraph in enumerate(cell.paragraphs):
+                    yield ('table', table_idx, row_idx, cell_idx, paragraph_idx), paragraph
+
+
+def _runs(paragraph):
+    """The paragraph's runs in order, including those inside hyperlinks
+
+    (paragraph.runs leaves hyperlink runs out, though paragraph.text has
+    their text)
+    """
+    from docx.text.run import Run
+
+    return [Run(r, paragraph) for r in paragraph._p.xpath('./w:r | ./w:hyperlink/w:r')]
+
+
+def _paragraph_at(doc, path):
+    if path[0] == 'body':
+        return doc.paragraphs[path[1]]
+    _, table_idx, row_idx, cell_idx, paragraph_idx = path
+    return doc.tables[table_idx].rows[row_idx].cells[cell_idx].paragraphs[paragraph_idx]
+
+
+class CompiledTemplate:
+    """A Word template parsed once, with the location of every placeholder
+
+    slots lists (path, placeholders, in_runs) for each paragraph holding a
+    placeholder; in_runs is False when Word split a placeholder across runs.
+    Placeholders only in text outside any run (fields, content controls)
+    can't be filled and are left out.
+    """
+
+    __slots__ = ('docx_bytes', 'slots')
+
+    def __init__(self, docx_bytes, slots):
+        self.docx_bytes = docx_bytes
+        self.slots = slots
+
+    @classmethod
+    def compile(cls, docx_bytes):
+        from docx import Document
+
+        doc = Document(io.BytesIO(docx_bytes))
+        slots = []
+
+        for path, paragraph in _iter_paragraphs(doc):
+            runs = _runs(paragraph)
+            placeholders = PLACEHOLDER.findall(''.join(run.text for run in runs))
+            if not placeholders:
+                continue
+            in_runs = sum(len(PLACEHOLDER.findall(run.text)) for run in runs) == len(placeholders)
+            slots.append((path, placeholders, in_runs))
+
+        return cls(docx_bytes, slots)
+
+    @property
+    def placeholders(self):
+        return {placeholder for _, placeholders, _ in self.slots for placeholder in placeholders}
+
+    def fill(self, values, docx_path):
+        """Fill every slot from values ({placeholder: text}) in one pass and save"""
+        from docx import Document
+
+        doc = Document(io.BytesIO(self.docx_bytes))
+        replace = lambda match: values.get(match.group(0), match.group(0))
+
+        for path, _, in_runs in self.slots:
+            runs = _runs(_paragraph_at(doc, path))
+            if not runs:
+                continue
+
+            if in_runs:
+                # Replace inside each run so its formatting is kept
+                for run in runs:
+                    if '{{' in run.text:
+                        run.text = PLACEHOLDER.sub(replace, run.text)
+            else:
+                # The first run takes the whole filled text
+                runs[0].text = PLACEHOLDER.sub(replace, ''.join(run.text for run in runs))
+                for run in runs[1:]:
+                    run.text = ''
+
+        doc.save(docx_path)
+
+
+def _cache_path(file_id, modified_time):
+    stamp = re.sub(r'[^0-9A-Za-z]', '', modified_time or '')
+    return os.path.join(CACHE_DIR, f"template_{file_id}_{stamp}.pkl.gz")
+
+
+def load_compiled_template(drive_service, file_id, modified_time, log=None):
+    """Compiled template for a Google Doc, downloaded only when it has changed"""
+    log = log or (lambda message: None)
+    path = _cache_path(file_id, modified_time)
+
+    if os.path.exists(path):
+        try:
+            with gzip.open(path, 'rb') as f:
+                stored = pickle.load(f)
+            log("Using cached template (unchanged since last download)")
+            return CompiledTemplate(stored['docx_bytes'], stored['slots'])
+        except Exception:
+            # Corrupt or outdated cache file - download again
+            pass
+
+    log("Downloading template...")
+    request = drive_service.files().export_media(fileId=file_id, mimeType=DOCX_MIME_TYPE)
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request)
+    done = False
+    while not done:
+        status, done = downloader.next_chunk()
+
+    template = CompiledTemplate.compile(fh.getvalue())
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with replace_file(path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+        pickle.dump({'docx_bytes': template.docx_bytes, 'slots': template.slots}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    log("Template downloaded")
+    return template
@@ -0,0 +1,119 @@
+from api_client import call, IDEMPOTENT_METHODS
+from googleapiclient.errors import HttpError
+from rate_limit import should_retry
+import random
+import time
+
+# Google's batch endpoint takes at most 100 calls per HTTP request
+BATCH_SIZE = 100
+
+
+def list_all_files(drive_service, q=None, fields='id, name', page_size=1000):
+    """Every file matching a query, following nextPageToken through all pages"""
+    files = []
+    page_token = None
+
+    while True:
+        results = drive_service.files().list(
+            q=q,
+            pageSize=page_size,
+            pageToken=page_token,
+            fields=f"nextPageToken, files({fields})"
+        ).execute()
+        files.extend(results.get('files', []))
+
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return files
+
+
+def run_batch(drive_service, requests, retries=5, progress=None):
+    """Send Drive requests through the batch endpoint, 100 per HTTP request
+
+    requests is {key: request}. Each batch goes through api_client.call, so
+    it waits for the Drive budget (one request per call in it) and shows up
+    in the metrics. Calls that fail with a quota or server error are sent
+    again (with backoff) in a later batch. Returns (results, errors), both
+    keyed like requests.
+    """
+    results = {}
+    errors = {}
+    pending = dict(requests)
+
+    for attempt in range(retries + 1):
+        retry = {}
+        keys = list(pending)
+
+        for start in range(0, len(keys), BATCH_SIZE):
+            chunk = keys[start:start + BATCH_SIZE]
+
+            def callback(request_id, response, exception):
+                key = chunk[int(request_id)]
+                if exception is None:
+                    results[key] = response
+                    errors.pop(key, None)
+                elif isinstance(exception, HttpError) and should_retry(exception) and attempt < retries:
+                    retry[key] = pending[key]
+                else:
+                    errors[key] = exception
+
+            batch = drive_service.new_batch_http_request(callback=callback)
+            for idx, key in enumerate(chunk):
+                batch.add(pending[key], request_id=str(idx))
+            # A batch that failed outright may have been partly applied,
+            # so it's only sent again if every call in it is safe to repeat
+            idempotent = all(pending[key].method.upper() in IDEMPOTENT_METHODS for key in chunk)
+            call('drive', batch.execute, idempotent=idempotent, cost=len(chunk))
+
+            if progress:
+                progress(len(results), len(requests))
+
+        if not retry:
+            break
+
+        pending = retry
+        # Exponential backoff with jitter before retrying the failed calls
+        time.sleep(min(60, 2 ** attempt) + random.random())
+
+    return results, errors
+
+
+def delete_files(drive_service, file_ids, progress=None):
+    """Delete files in batches, returns {file_id: error} for any that failed"""
+    requests = {file_id: drive_service.files().delete(fileId=file_id) for file_id in file_ids}
+    _, errors = run_batch(drive_service, requests, progress=progress)
+    return errors
+
+
+def move_files(drive_service, file_ids, folder_id, from_folder_id=None, progress=None):
+    """Move files into a folder in batches, returns {file_id: error} for any that failed"""
+    requests = {
+        file_id: drive_service.files().update(
+            fileId=file_id,
+            addParents=folder_id,
+            removeParents=from_folder_id,
+            fields='id, parents'
+        )
+        for file_id in file_ids
+    }
+    _, errors = run_batch(drive_service, requests, progress=progress)
+    return errors
+
+
+def share_files(drive_service, file_ids, permission, progress=None):
+    """Add the same permission to many files in batches, returns {file_id: error}
+
+    permission is a Drive permission body, e.g.
+    {'type': 'user', 'role': 'reader', 'emailAddress': ...}.
+    """
+    requests = {
+        file_id: drive_service.permissions().create(
+            fileId=file_id,
+            body=permission,
+            sendNotificationEmail=False,
+            fields='id'
+        )
+        for file_id in file_ids
+    }
+    _, errors = run_batch(drive_service, requests, progress=progress)
+    return errors
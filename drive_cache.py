@@ -0,0 +1,150 @@
+from master_snapshot import CACHE_DIR, replace_file
+from drive_bulk import list_all_files, run_batch
+from googleapiclient.errors import HttpError
+import json
+import os
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# Drive folder and template ids found by earlier runs
+IDS_PATH = os.path.join(CACHE_DIR, 'drive_ids.json')
+
+
+def _quote(name):
+    """Escape a name for a Drive query string"""
+    return name.replace('\\', '\\\\').replace("'", "\\'")
+
+
+class DriveIds:
+    """Persistent name -> id cache for Drive folders and templates
+
+    Cached ids are used without looking them up again. A stale id (deleted
+    or trashed) is only noticed when it's checked or used, then it's
+    forgotten and found again by name.
+    """
+
+    def __init__(self, drive_service):
+        self.drive_service = drive_service
+        try:
+            with open(IDS_PATH, 'r', encoding='utf-8') as f:
+                self.ids = json.load(f)
+        except (OSError, ValueError):
+            self.ids = {}
+        self._folders_listed = False
+        # Ids seen in Drive responses this run, and cached ids not checked yet
+        self.confirmed = set()
+        self.unchecked = set()
+
+    def save(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with replace_file(IDS_PATH) as f:
+            json.dump(self.ids, f, indent=2)
+
+    def forget(self, file_id):
+        """Drop a stale id (and anything cached under it)"""
+        stale = [key for key, value in self.ids.items() if value == file_id or f"/{file_id}/" in key]
+        for key in stale:
+            del self.ids[key]
+        self.save()
+
+    @staticmethod
+    def _folder_key(name, parent_id=None):
+        return f"folder:/{parent_id or '*'}/{name}"
+
+    def load_all_folders(self):
+        """Cache every folder in one paged listing (resolves all schools' folders at once)"""
+        if self._folders_listed:
+            return
+        folders = list_all_files(
+            self.drive_service,
+            q=f"mimeType='{FOLDER_MIME_TYPE}' and trashed=false",
+            fields='id, name, parents'
+        )
+        # The first folder listed with a name wins, like files().list()[0] did
+        listed = {}
+        for folder in folders:
+            listed.setdefault(self._folder_key(folder['name']), folder['id'])
+            for parent_id in folder.get('parents', []):
+                listed.setdefault(self._folder_key(folder['name'], parent_id), folder['id'])
+            self.confirmed.add(folder['id'])
+
+        self.ids.update(listed)
+        self._folders_listed = True
+        self.save()
+
+    def folder(self, name, parent_id=None, log=None):
+        """Id of a folder (inside parent_id if given), creating it if it doesn't exist"""
+        log = log or (lambda message: None)
+        key = self._folder_key(name, parent_id)
+
+        if key not in self.ids:
+            self.load_all_folders()
+
+        if key in self.ids:
+            if self.ids[key] not in self.confirmed:
+                self.unchecked.add(self.ids[key])
+            log(f"✓ Found '{name}' folder")
+            return self.ids[key]
+
+        metadata = {'name': name, 'mimeType': FOLDER_MIME_TYPE}
+        if parent_id:
+            metadata['parents'] = [parent_id]
+        folder = self.drive_service.files().create(body=metadata, fields='id').execute()
+
+        self.confirmed.add(folder['id'])
+        self.ids[key] = folder['id']
+        if parent_id:
+            self.ids[self._folder_key(name)] = folder['id']
+        self.save()
+        log(f"✓ Created '{name}' folder")
+        return folder['id']
+
+    def verify(self):
+        """Check the cached folder ids used so far in one batch request
+
+        Stale ids are forgotten (so the next lookup finds the folder again)
+        and returned.
+        """
+        if not self.unchecked:
+            return []
+
+        requests = {
+            file_id: self.drive_service.files().get(fileId=file_id, fields='id, trashed')
+            for file_id in self.unchecked
+        }
+        self.unchecked = set()
+        results, errors = run_batch(self.drive_service, requests)
+
+        stale = [file_id for file_id in errors] + [
+            file_id for file_id, result in results.items() if result.get('trashed')
+        ]
+        for file_id in stale:
+            self.forget(file_id)
+        if stale:
+            self._folders_listed = False
+        return stale
+
+    def template(self, name, mime_type='application/vnd.google-apps.document'):
+        """{'id', 'modifiedTime'} of a template file by name, or None if not found"""
+        key = f"file:{mime_type}:{name}"
+        file_id = self.ids.get(key)
+
+        if file_id:
+            # Needed anyway for modifiedTime, and shows whether the id is stale
+            try:
+                template = self.drive_service.files().get(fileId=file_id, fields='id, modifiedTime, trashed').execute()
+                if not template.get('trashed'):
+                    return template
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+            self.forget(file_id)
+
+        query = f"name='{_quote(name)}' and mimeType='{mime_type}' and trashed=false"
+        templates = self.drive_service.files().list(q=query, fields='files(id, modifiedTime)').execute().get('files', [])
+        if not templates:
+            return None
+
+        self.ids[key] = templates[0]['id']
+        self.save()
+        return templates[0]
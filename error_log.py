@@ -0,0 +1,110 @@
+from data_checks import ISSUE_HEADER
+from sheets_batch import SheetsBatch
+import hashlib
+
+ERROR_LOG_TITLE = 'Error Log'
+
+# Staff can fill in Status (e.g. "Reviewed"); it stays as long as the issue does
+ERROR_LOG_HEADER = ISSUE_HEADER + ['Status', 'Issue ID']
+
+HEADER_FORMAT = {
+    'backgroundColor': {'red': 0.8, 'green': 0.2, 'blue': 0.2},
+    'textFormat': {
+        'foregroundColor': {'red': 1, 'green': 1, 'blue': 1},
+        'bold': True,
+        'fontSize': 12
+    },
+    'horizontalAlignment': 'CENTER'
+}
+
+
+def issue_id(issue):
+    """Stable id of an issue row (the suggestion text isn't part of it)"""
+    error_type, school, student_name, details = issue[:4]
+    key = '\x1f'.join([error_type, school, student_name, details])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def _resize_columns(batch):
+    """Plan fitting the columns to their text (send it after the values are written)"""
+    batch.add_request({
+        'autoResizeDimensions': {
+            'dimensions': {
+                'sheetId': batch.sheet_id(ERROR_LOG_TITLE),
+                'dimension': 'COLUMNS',
+                'startIndex': 0,
+                'endIndex': len(ERROR_LOG_HEADER)
+            }
+        }
+    })
+
+
+def _rewrite(batch, issues, log):
+    """Write the whole log (new sheet, or one from before issue ids)"""
+    if not batch.has_sheet(ERROR_LOG_TITLE):
+        log(f"  Creating new '{ERROR_LOG_TITLE}' sheet...")
+        batch.add_sheet(ERROR_LOG_TITLE, rows=max(1000, len(issues) + 1), cols=10)
+    else:
+        log(f"  Rewriting '{ERROR_LOG_TITLE}' sheet with issue ids...")
+        batch.clear(ERROR_LOG_TITLE)
+
+    batch.write_rows(ERROR_LOG_TITLE, 1, [ERROR_LOG_HEADER] + [issue + ['', issue_id(issue)] for issue in issues])
+    batch.format(ERROR_LOG_TITLE, 'A1:G1', HEADER_FORMAT)
+    batch.execute()
+
+    # Resized once the values are in
+    _resize_columns(batch)
+    return len(issues), 0
+
+
+def update_error_log(spreadsheet, issues, log=print):
+    """Bring the 'Error Log' sheet in line with issues, returns (added, removed)
+
+    Rows are matched by issue id: issues that went away are deleted, new
+    ones are appended and rows still present keep their Status. Changed
+    suggestions are updated in place. Costs two reads (the sheet list and
+    the log's values) and at most three writes: row deletions, changed
+    values, then a column resize for the new text.
+    """
+    batch = SheetsBatch(spreadsheet)
+    current = {}
+    for issue in issues:
+        current.setdefault(issue_id(issue), issue)
+
+    existing = batch.read_values([ERROR_LOG_TITLE], 'A:G').get(ERROR_LOG_TITLE) if batch.has_sheet(ERROR_LOG_TITLE) else None
+    if not existing or existing[0] != ERROR_LOG_HEADER:
+        added, removed = _rewrite(batch, list(current.values()), log)
+        batch.execute()
+        return added, removed
+
+    removed_rows = []
+    kept = []  # (issue id, sheet row values) in sheet order
+    kept_ids = set()
+    for row_number, row in enumerate(existing[1:], start=2):
+        row = row + [''] * (len(ERROR_LOG_HEADER) - len(row))
+        row_id = row[6]
+        # Resolved issues, and duplicate or hand-added rows without an id, go
+        if row_id in current and row_id not in kept_ids:
+            kept.append((row_id, row))
+            kept_ids.add(row_id)
+        else:
+            removed_rows.append(row_number)
+
+    batch.delete_rows(ERROR_LOG_TITLE, removed_rows)
+
+    # Rows that stayed move up over the deleted ones; refresh any whose text changed
+    updated = 0
+    for position, (row_id, row) in enumerate(kept):
+        if row[:5] != current[row_id]:
+            batch.write_rows(ERROR_LOG_TITLE, position + 2, [current[row_id]])
+            updated += 1
+
+    new_rows = [issue + ['', row_id] for row_id, issue in current.items() if row_id not in kept_ids]
+    batch.write_rows(ERROR_LOG_TITLE, len(kept) + 2, new_rows)
+    batch.execute()
+
+    # Resized once the values are in; nothing to fit if the log didn't change
+    if new_rows or removed_rows or updated:
+        _resize_columns(batch)
+        batch.execute()
+    return len(new_rows), len(removed_rows)
@@ -2,13 +2,32 @@ import gspread
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
 import os
 import pickle
 import io
 from PyPDF2 import PdfMerger
-import time
+from concurrent.futures import ThreadPoolExecutor
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
+import threading
+import json
+from datetime import datetime
+from gspread.utils import absolute_range_name
+from api_client import authorize, build_service, call, set_entry_point, metrics
+from order_doc_plan import load_template_layout, order_doc_requests
+from drive_bulk import list_all_files, delete_files
+from drive_cache import DriveIds
+from order_forms import is_pickup_row, group_orders
+
+# Orders being built at the same time (shared by every school in a batch)
+MAX_CONCURRENT_ORDERS = 8
+
+# Schools whose combined PDFs are assembled and uploaded at the same time
+MAX_CONCURRENT_SCHOOLS = 4
+
+# What a batch run produced, per school
+MANIFEST_FILE = 'order_exports_manifest.json'
 
 # Set up OAuth credentials
 SCOPES = [
@@ -40,9 +59,11 @@ creds = get_credentials()
 print("Authentication successful!")
 
 # Connect to services
-gc = gspread.authorize(creds)
-docs_service = build('docs', 'v1', credentials=creds)
-drive_service = build('drive', 'v3', credentials=creds)
+# API calls are retried on quota/server errors and kept within the quotas
+set_entry_point('export_orders')
+gc = authorize(creds)
+docs_service = build_service('docs', 'v1', creds)
+drive_service = build_service('drive', 'v3', creds)
 
 # Open spreadsheet
 spreadsheet = gc.open('MASTER SPRING 2026')
@@ -63,383 +84,122 @@ for idx, school_name in enumerate(school_sheets, 1):
     display_name = school_name.replace(' MASTER', '')
     print(f"  {idx}. {display_name}")
 
-choice = input("\nEnter the number of the school you want to process: ")
+choice = input("\nEnter the number of the school you want to process (several like 1,3,5, or 'all'): ")
 
 try:
-    school_index = int(choice) - 1
-    selected_sheet_name = school_sheets[school_index]
-    school_name = selected_sheet_name.replace(' MASTER', '')
+    if choice.strip().lower() == 'all':
+        selected_sheet_names = school_sheets
+    else:
+        indexes = [int(part) - 1 for part in choice.split(',')]
+        if any(not 0 <= school_index < len(school_sheets) for school_index in indexes):
+            raise ValueError(choice)
+        selected_sheet_names = [school_sheets[school_index] for school_index in indexes]
 except:
     print("Invalid choice!")
     exit()
 
-print(f"\n✓ Selected: {school_name}")
+school_names = [sheet_name.replace(' MASTER', '') for sheet_name in selected_sheet_names]
+print(f"\n✓ Selected: {', '.join(school_names)}")
 
-# Find or create template
+# Folder and template ids are remembered between runs
+drive_ids = DriveIds(drive_service)
+
+# Find template (once, however many schools are processed)
 print("\nFinding template...")
-template_query = "name='Order Template for PDF' and mimeType='application/vnd.google-apps.document'"
-template_results = drive_service.files().list(q=template_query).execute()
-templates = template_results.get('files', [])
+template = drive_ids.template('Order Template for PDF')
 
-if not templates:
+if not template:
     print("ERROR: Template 'Order Template for PDF' not found!")
     print("Please create or rename your template to 'Order Template for PDF'")
     exit()
 
-TEMPLATE_ID = templates[0]['id']
+TEMPLATE_ID = template['id']
 print(f"✓ Found template")
 
+# Where the items table sits in the template (read once per template revision)
+template_layout = load_template_layout(docs_service, TEMPLATE_ID, template.get('modifiedTime'))
+
 # Find or create folder structure
 print("\nSetting up folders...")
 
-# Main folder: "[School Name] Orders"
-main_folder_name = f"{school_name} Orders"
-main_folder_query = f"name='{main_folder_name}' and mimeType='application/vnd.google-apps.folder'"
-main_folder_results = drive_service.files().list(q=main_folder_query).execute()
-main_folders = main_folder_results.get('files', [])
-
-if main_folders:
-    main_folder_id = main_folders[0]['id']
-    print(f"✓ Found '{main_folder_name}' folder")
-else:
-    # Create main folder
-    main_folder_metadata = {
-        'name': main_folder_name,
-        'mimeType': 'application/vnd.google-apps.folder'
-    }
-    main_folder = drive_service.files().create(body=main_folder_metadata, fields='id').execute()
-    main_folder_id = main_folder['id']
-    print(f"✓ Created '{main_folder_name}' folder")
-
-# Individual Documents subfolder
-docs_folder_name = f"{school_name} Individual Documents"
-docs_folder_query = f"name='{docs_folder_name}' and '{main_folder_id}' in parents and mimeType='application/vnd.google-apps.folder'"
-docs_folder_results = drive_service.files().list(q=docs_folder_query).execute()
-docs_folders = docs_folder_results.get('files', [])
-
-if docs_folders:
-    docs_folder_id = docs_folders[0]['id']
-    print(f"✓ Found '{docs_folder_name}' folder")
-else:
-    docs_folder_metadata = {
-        'name': docs_folder_name,
-        'mimeType': 'application/vnd.google-apps.folder',
-        'parents': [main_folder_id]
-    }
-    docs_folder = drive_service.files().create(body=docs_folder_metadata, fields='id').execute()
-    docs_folder_id = docs_folder['id']
-    print(f"✓ Created '{docs_folder_name}' folder")
-
-# PDFs subfolder
-pdfs_folder_name = f"{school_name} PDFs"
-pdfs_folder_query = f"name='{pdfs_folder_name}' and '{main_folder_id}' in parents and mimeType='application/vnd.google-apps.folder'"
-pdfs_folder_results = drive_service.files().list(q=pdfs_folder_query).execute()
-pdfs_folders = pdfs_folder_results.get('files', [])
-
-if pdfs_folders:
-    pdfs_folder_id = pdfs_folders[0]['id']
-    print(f"✓ Found '{pdfs_folder_name}' folder")
-else:
-    pdfs_folder_metadata = {
-        'name': pdfs_folder_name,
-        'mimeType': 'application/vnd.google-apps.folder',
-        'parents': [main_folder_id]
-    }
-    pdfs_folder = drive_service.files().create(body=pdfs_folder_metadata, fields='id').execute()
-    pdfs_folder_id = pdfs_folder['id']
-    print(f"✓ Created '{pdfs_folder_name}' folder")
-
-# Read from school-specific sheet
-school_sheet = spreadsheet.worksheet(selected_sheet_name)
-data = school_sheet.get_all_values()
-headers = data[0]
-rows = data[1:]
-
-print(f"\nSuccess! Found {len(rows)} rows in {selected_sheet_name}")
-
-# Filter for "Pick-up at school" orders
-# Column indices in school sheet: A, AW, AY, Q, R, S, O, Y, AV
-col_order_num = 0   # A
-col_student = 1     # AW
-col_grade = 2       # AY
-col_quantity = 3    # Q
-col_flavor = 4      # R
-col_price = 5       # S
-col_delivery = 6    # O
-col_billing = 7     # Y
-col_school = 8      # AV
-
-pickup_orders = []
-for row in rows:
-    if len(row) > col_delivery and row[col_delivery] == 'Pick-up at school':
-        pickup_orders.append(row)
-
-print(f"Found {len(pickup_orders)} orders with 'Pick-up at school'")
-
-# Group orders
-orders = {}
-
-for row in pickup_orders:
-    order_num = row[col_order_num]
-    quantity = int(row[col_quantity]) if row[col_quantity].isdigit() else 0
-    flavor = row[col_flavor]
-    
-    student_name = row[col_student] if len(row) > col_student else ''
-    student_grade = row[col_grade] if len(row) > col_grade else ''
-    billing_name = row[col_billing] if len(row) > col_billing else ''
-    school = row[col_school] if len(row) > col_school else ''
-    
-    if order_num not in orders:
-        orders[order_num] = {
-            'order_number': order_num,
-            'billing_name': billing_name,
-            'school': school,
-            'student_name': student_name,
-            'student_grade': student_grade,
-            'items': []
-        }
-    
-    orders[order_num]['items'].append({'flavor': flavor, 'quantity': quantity})
+def resolve_folders(school_name):
+    # Main folder: "[School Name] Orders", with Individual Documents and PDFs subfolders
+    main_folder_id = drive_ids.folder(f"{school_name} Orders", log=print)
+    docs_folder_id = drive_ids.folder(f"{school_name} Individual Documents", main_folder_id, log=print)
+    pdfs_folder_id = drive_ids.folder(f"{school_name} PDFs", main_folder_id, log=print)
+    return main_folder_id, docs_folder_id, pdfs_folder_id
 
-print(f"Grouped into {len(orders)} unique orders")
+folders = {school_name: resolve_folders(school_name) for school_name in school_names}
 
-# Sort orders by grade then student name
-def grade_sort_key(grade):
-    grade_upper = grade.upper().strip()
-    
-    if grade_upper == 'K' or grade_upper.startswith('KINDER'):
-        return (0, '')
-    
-    if grade_upper.isdigit():
-        return (int(grade_upper), '')
-    
-    if grade_upper and grade_upper[0].isdigit():
-        return (int(grade_upper[0]), grade_upper)
-    
-    return (999, grade_upper)
+# Cached ids are checked together; any deleted folders are found or created again
+if drive_ids.verify():
+    folders = {school_name: resolve_folders(school_name) for school_name in school_names}
 
-sorted_orders = sorted(
-    orders.items(),
-    key=lambda x: (grade_sort_key(x[1]['student_grade']), x[1]['student_name'])
-)
+# Read every selected school sheet in one request
+response = spreadsheet.values_batch_get([absolute_range_name(sheet_name, 'A:I') for sheet_name in selected_sheet_names])
 
-print("\nOrders sorted by grade then student name:")
-for order_num, order in sorted_orders:
-    print(f"  Grade {order['student_grade']}: {order['student_name']} (Order #{order_num})")
+# Filter for "Pick-up at school" orders, grouped and sorted by grade then student name
+school_orders = {}
+for school_name, sheet_name, value_range in zip(school_names, selected_sheet_names, response.get('valueRanges', [])):
+    rows = value_range.get('values', [])[1:]
+    print(f"\nSuccess! Found {len(rows)} rows in {sheet_name}")
 
-# Delete old files
-print("\nCleaning up old files...")
+    pickup_orders = [row for row in rows if is_pickup_row(row)]
+    print(f"Found {len(pickup_orders)} orders with 'Pick-up at school'")
 
-old_docs_query = f"'{docs_folder_id}' in parents"
-old_docs = drive_service.files().list(q=old_docs_query).execute().get('files', [])
-for doc in old_docs:
-    drive_service.files().delete(fileId=doc['id']).execute()
-print(f"Deleted {len(old_docs)} old documents")
+    sorted_orders = group_orders(pickup_orders)
+    print(f"Grouped into {len(sorted_orders)} unique orders")
 
-old_pdfs_query = f"'{pdfs_folder_id}' in parents"
-old_pdfs = drive_service.files().list(q=old_pdfs_query).execute().get('files', [])
-for pdf in old_pdfs:
-    drive_service.files().delete(fileId=pdf['id']).execute()
-print(f"Deleted {len(old_pdfs)} old PDFs")
+    print("\nOrders sorted by grade then student name:")
+    for order in sorted_orders:
+        print(f"  Grade {order['student_grade']}: {order['student_name']} (Order #{order['order_number']})")
 
-# Create individual documents
-print("\nCreating individual order documents...")
-pdf_files = []
+    school_orders[school_name] = sorted_orders
 
-for order_idx, (order_num, order) in enumerate(sorted_orders):
-    print(f"  Creating document for order #{order_num} ({order_idx + 1}/{len(sorted_orders)})...")
+# Delete old files
+print("\nCleaning up old files...")
+
+for school_name in school_names:
+    _, docs_folder_id, pdfs_folder_id = folders[school_name]
+
+    old_docs_query = f"'{docs_folder_id}' in parents"
+    old_docs = list_all_files(drive_service, q=old_docs_query)
+    delete_errors = delete_files(drive_service, [doc['id'] for doc in old_docs])
+    print(f"{school_name}: deleted {len(old_docs) - len(delete_errors)} old documents")
+
+    old_pdfs_query = f"'{pdfs_folder_id}' in parents"
+    old_pdfs = list_all_files(drive_service, q=old_pdfs_query)
+    delete_errors = delete_files(drive_service, [pdf['id'] for pdf in old_pdfs])
+    print(f"{school_name}: deleted {len(old_pdfs) - len(delete_errors)} old PDFs")
+
+# Google API clients aren't thread-safe, so each worker thread gets its own
+thread_services = threading.local()
+
+def order_services():
+    if not hasattr(thread_services, 'docs'):
+        thread_services.docs = build_service('docs', 'v1', http=AuthorizedHttp(creds, http=httplib2.Http()))
+        thread_services.drive = build_service('drive', 'v3', http=AuthorizedHttp(creds, http=httplib2.Http()))
+    return thread_services.docs, thread_services.drive
+
+def create_order_pdf(job):
+    """Copy the template for one order, fill it in and return it exported as a PDF"""
+    school_name, order_idx, order_count, order, docs_folder_id = job
+    order_num = order['order_number']
+    docs_service, drive_service = order_services()
+    print(f"  {school_name}: creating document for order #{order_num} ({order_idx + 1}/{order_count})...")
     
-    # Copy template
+    # Copy template straight into the Individual Documents folder
     copy_title = f"Grade {order['student_grade']} - {order['student_name']} - Order {order_num}"
     order_copy = drive_service.files().copy(
         fileId=TEMPLATE_ID,
-        body={'name': copy_title}
+        body={'name': copy_title, 'parents': [docs_folder_id]}
     ).execute()
     order_copy_id = order_copy.get('id')
     
-    # Build replacements
-    all_requests = []
-    
-    main_replacements = [
-        ('{{Order Number}}', order['order_number']),
-        ('{{Billing Name}}', order['billing_name']),
-        ('{{Student name}}', order['student_name']),
-        ('{{student name}}', order['student_name']),
-        ('{{Grade}}', order['student_grade']),
-        ('{{School}}', order['school'])
-    ]
-    
-    for placeholder, value in main_replacements:
-        all_requests.append({
-            'replaceAllText': {
-                'containsText': {'text': placeholder, 'matchCase': True},
-                'replaceText': value
-            }
-        })
-    
-    # Item replacements
-    for i in range(1, 14):
-        item_index = i - 1
-        
-        if item_index < len(order['items']):
-            item = order['items'][item_index]
-            qty_value = str(item['quantity'])
-            flavor_value = item['flavor']
-        else:
-            qty_value = ''
-            flavor_value = ''
-        
-        qty_placeholder = '{{quantity' + str(i) + '}}'
-        all_requests.append({
-            'replaceAllText': {
-                'containsText': {'text': qty_placeholder, 'matchCase': True},
-                'replaceText': qty_value
-            }
-        })
-        
-        flavor_placeholder = '{{flavor name' + str(i) + '}}'
-        all_requests.append({
-            'replaceAllText': {
-                'containsText': {'text': flavor_placeholder, 'matchCase': True},
-                'replaceText': flavor_value
-            }
-        })
-    
-    # Apply replacements
+    # Placeholders, popcorn/coffee summary and empty-row deletion in one call
     docs_service.documents().batchUpdate(
         documentId=order_copy_id,
-        body={'requests': all_requests}
-    ).execute()
-    
-    # Calculate popcorn vs coffee counts
-    popcorn_count = 0
-    coffee_count = 0
-    
-    for item in order['items']:
-        flavor = item['flavor'].lower()
-        quantity = item['quantity']
-        
-        if 'coffee' in flavor:
-            coffee_count += quantity
-        else:
-            popcorn_count += quantity
-    
-    # Get document to find items table end
-    doc = docs_service.documents().get(documentId=order_copy_id).execute()
-    content = doc.get('body').get('content')
-    
-    # Find the items table
-    items_table_end = None
-    for element in content:
-        if 'table' in element:
-            table = element.get('table')
-            table_text = ""
-            
-            for row in table.get('tableRows', []):
-                for cell in row.get('tableCells', []):
-                    for cell_content in cell.get('content', []):
-                        if 'paragraph' in cell_content:
-                            for elem in cell_content.get('paragraph', {}).get('elements', []):
-                                if 'textRun' in elem:
-                                    table_text += elem.get('textRun', {}).get('content', '')
-            
-            if 'Quantity' in table_text and 'Flavor' in table_text:
-                items_table_end = element.get('endIndex')
-                break
-    
-    # Insert summary after the table
-    if items_table_end:
-        popcorn_label = "bag" if popcorn_count == 1 else "bags"
-        coffee_label = "bag" if coffee_count == 1 else "bags"
-        summary_text = f"\n\nPopcorn: {popcorn_count} {popcorn_label}     Coffee: {coffee_count} {coffee_label}\n"
-        
-        summary_requests = [
-            {
-                'insertText': {
-                    'location': {'index': items_table_end},
-                    'text': summary_text
-                }
-            },
-            {
-                'updateTextStyle': {
-                    'range': {
-                        'startIndex': items_table_end,
-                        'endIndex': items_table_end + len(summary_text)
-                    },
-                    'textStyle': {
-                        'bold': True,
-                        'fontSize': {'magnitude': 12, 'unit': 'PT'},
-                        'weightedFontFamily': {
-                            'fontFamily': 'Lexend',
-                            'weight': 700
-                        }
-                    },
-                    'fields': 'bold,fontSize,weightedFontFamily'
-                }
-            }
-        ]
-        
-        docs_service.documents().batchUpdate(
-            documentId=order_copy_id,
-            body={'requests': summary_requests}
-        ).execute()
-    
-    # Delete empty rows from items table
-    num_items = len(order['items'])
-    if num_items < 13:
-        doc = docs_service.documents().get(documentId=order_copy_id).execute()
-        content = doc.get('body').get('content')
-        
-        items_table = None
-        items_table_start = None
-        
-        for element in content:
-            if 'table' in element:
-                table = element.get('table')
-                table_text = ""
-                
-                for row in table.get('tableRows', []):
-                    for cell in row.get('tableCells', []):
-                        for cell_content in cell.get('content', []):
-                            if 'paragraph' in cell_content:
-                                for elem in cell_content.get('paragraph', {}).get('elements', []):
-                                    if 'textRun' in elem:
-                                        table_text += elem.get('textRun', {}).get('content', '')
-                
-                if 'Quantity' in table_text and 'Flavor' in table_text:
-                    items_table = table
-                    items_table_start = element.get('startIndex')
-                    break
-        
-        if items_table and items_table_start:
-            num_rows = len(items_table.get('tableRows', []))
-            
-            delete_requests = []
-            rows_to_delete = num_rows - (num_items + 1)
-            
-            if rows_to_delete > 0:
-                for i in range(rows_to_delete):
-                    delete_requests.append({
-                        'deleteTableRow': {
-                            'tableCellLocation': {
-                                'tableStartLocation': {'index': items_table_start},
-                                'rowIndex': num_items + 1,
-                                'columnIndex': 0
-                            }
-                        }
-                    })
-                
-                if delete_requests:
-                    docs_service.documents().batchUpdate(
-                        documentId=order_copy_id,
-                        body={'requests': delete_requests}
-                    ).execute()
-    
-    # Move to Individual Documents folder
-    drive_service.files().update(
-        fileId=order_copy_id,
-        addParents=docs_folder_id,
-        fields='id, parents'
+        body={'requests': order_doc_requests(template_layout, order)}
     ).execute()
     
     # Export as PDF
@@ -448,63 +208,89 @@ for order_idx, (order_num, order) in enumerate(sorted_orders):
         mimeType='application/pdf'
     )
     
-    pdf_filename = f"temp_{order_idx}.pdf"
-    fh = io.FileIO(pdf_filename, 'wb')
+    # Kept in memory and appended to the combined PDF (no temp files)
+    fh = io.BytesIO()
     downloader = MediaIoBaseDownload(fh, request)
     done = False
     while done is False:
-        status, done = downloader.next_chunk()
-    fh.close()
+        status, done = call('drive', downloader.next_chunk)
+    fh.seek(0)
     
-    pdf_files.append(pdf_filename)
-
-print(f"\n✓ Created {len(sorted_orders)} individual documents")
-
-# Combine PDFs
-print("\nCombining PDFs in sorted order...")
-merger = PdfMerger()
-
-for pdf_file in pdf_files:
-    merger.append(pdf_file)
-
-combined_pdf_filename = f"{school_name}_Orders_Combined.pdf"
-merger.write(combined_pdf_filename)
-merger.close()
-
-print(f"✓ Combined into one PDF")
-
-# Upload combined PDF
-print("\nUploading combined PDF to Google Drive...")
-file_metadata = {
-    'name': f'{school_name} Orders - Combined.pdf',
-    'parents': [pdfs_folder_id]
-}
+    return fh
+
+def export_school(school_name):
+    """Build one school's documents and upload its combined PDF, returns the PDF's link"""
+    sorted_orders = school_orders[school_name]
+    _, docs_folder_id, pdfs_folder_id = folders[school_name]
+    jobs = [(school_name, order_idx, len(sorted_orders), order, docs_folder_id) for order_idx, order in enumerate(sorted_orders)]
+    merger = PdfMerger()
+
+    # Orders of every school share one pool; map() returns this school's PDFs
+    # in sorted order while later orders are still in flight
+    for pdf_data in order_executor.map(create_order_pdf, jobs):
+        merger.append(pdf_data)
+
+    print(f"\n✓ {school_name}: created {len(sorted_orders)} individual documents")
+
+    # Combine PDFs
+    combined_pdf_data = io.BytesIO()
+    merger.write(combined_pdf_data)
+    merger.close()
+    combined_pdf_data.seek(0)
+
+    # Upload combined PDF
+    file_metadata = {
+        'name': f'{school_name} Orders - Combined.pdf',
+        'parents': [pdfs_folder_id]
+    }
 
-media = MediaFileUpload(combined_pdf_filename, mimetype='application/pdf')
-combined_pdf = drive_service.files().create(
-    body=file_metadata,
-    media_body=media,
-    fields='id, webViewLink'
-).execute()
+    media = MediaIoBaseUpload(combined_pdf_data, mimetype='application/pdf')
+    combined_pdf = order_services()[1].files().create(
+        body=file_metadata,
+        media_body=media,
+        fields='id, webViewLink'
+    ).execute()
 
-print(f"✓ Uploaded combined PDF")
+    print(f"✓ {school_name}: uploaded combined PDF")
+    return combined_pdf['webViewLink']
 
-# Clean up local files
-print("\nCleaning up temporary files...")
-time.sleep(2)
+# Create individual documents, several orders (and schools) at a time
+print("\nCreating individual order documents...")
+manifest = {'generated': datetime.now().isoformat(timespec='seconds'), 'schools': {}}
+
+with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_ORDERS) as order_executor:
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SCHOOLS) as school_executor:
+        futures = {
+            school_name: school_executor.submit(export_school, school_name)
+            for school_name in school_names
+            if school_orders[school_name]
+        }
 
-for pdf_file in pdf_files:
-    try:
-        os.remove(pdf_file)
-    except:
-        pass
+    for school_name in school_names:
+        entry = {'orders': len(school_orders[school_name]), 'combined_pdf': None, 'error': None}
+        if school_name not in futures:
+            entry['error'] = "No pick-up orders found for this school"
+        else:
+            try:
+                entry['combined_pdf'] = futures[school_name].result()
+            except Exception as e:
+                entry['error'] = str(e)
+        manifest['schools'][school_name] = entry
 
-try:
-    os.remove(combined_pdf_filename)
-except:
-    pass
+with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+    json.dump(manifest, f, indent=2)
 
 print(f"\n✅ COMPLETE!")
-print(f"\n📁 Individual documents: {len(sorted_orders)} files in '{school_name} Individual Documents' folder")
-print(f"📄 Combined PDF: '{school_name} Orders - Combined.pdf' in '{school_name} PDFs' folder")
-print(f"\nView combined PDF: {combined_pdf['webViewLink']}")
\ No newline at end of file
+for school_name, entry in manifest['schools'].items():
+    if entry['error']:
+        print(f"\n⚠️  {school_name}: {entry['error']}")
+        continue
+    print(f"\n📁 {school_name} - individual documents: {entry['orders']} files in '{school_name} Individual Documents' folder")
+    print(f"📄 Combined PDF: '{school_name} Orders - Combined.pdf' in '{school_name} PDFs' folder")
+    print(f"View combined PDF: {entry['combined_pdf']}")
+
+print(f"\nManifest written to {MANIFEST_FILE}")
+
+print("\nAPI usage:")
+for line in metrics.report():
+    print(f"  {line}")
@@ -0,0 +1,214 @@
+from master_snapshot import CACHE_DIR
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+
+# Jobs survive page reloads and app restarts in this database
+JOBS_DB = os.path.join(CACHE_DIR, 'jobs.sqlite3')
+
+# Jobs running at the same time
+MAX_WORKERS = 3
+
+# Kinds that write shared sheets and sync state: one job of each kind runs
+# at a time (e.g. an update and a full rebuild of the school sheets)
+EXCLUSIVE_KINDS = ('organize_schools',)
+
+# How often a running job's output is written to the database (seconds)
+OUTPUT_FLUSH_INTERVAL = 0.5
+
+# Job kinds: label shown in the dashboard, and the scripts.py function to run
+JOB_KINDS = {
+    'order_forms': ("Order forms", 'export_order_forms'),
+    'all_order_forms': ("Order forms (all schools)", 'export_all_order_forms'),
+    'organize_schools': ("Update school sheets", 'organize_schools'),
+    'production_report': ("Production report", 'create_production_report')
+}
+
+_lock = threading.Lock()
+_executor = None
+_kind_locks = {kind: threading.Lock() for kind in EXCLUSIVE_KINDS}
+
+
+def _connect():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(JOBS_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _init_db():
+    with closing(_connect()) as conn, conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                args TEXT NOT NULL,
+                status TEXT NOT NULL,
+                output TEXT NOT NULL DEFAULT '',
+                error TEXT,
+                result_file TEXT,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT
+            )
+        """)
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _update(job_id, **fields):
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with closing(_connect()) as conn, conn:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+
+
+class JobOutput:
+    """List-like log for scripts.py's output.append(), saved while the job runs"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.lines = []
+        self.last_flush = 0.0
+
+    def append(self, line):
+        self.lines.append(line)
+        if time.monotonic() - self.last_flush >= OUTPUT_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        _update(self.job_id, output="\n".join(self.lines))
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+
+def _run(job_id, kind, args):
+    # Waits (still queued) while another job of an exclusive kind runs
+    kind_lock = _kind_locks.get(kind)
+    if kind_lock is None:
+        _run_job(job_id, kind, args)
+        return
+    with kind_lock:
+        _run_job(job_id, kind, args)
+
+
+def _run_job(job_id, kind, args):
+    import scripts
+
+    _update(job_id, status='running', started_at=_now())
+    output = JobOutput(job_id)
+
+    try:
+        result = getattr(scripts, JOB_KINDS[kind][1])(output=output, **args)
+        error = result[1]
+        result_file = result[2] if len(result) > 2 else None
+    except Exception as e:
+        error = f"{str(e)}\n{traceback.format_exc()}"
+        result_file = None
+
+    output.flush()
+    _update(
+        job_id,
+        status='failed' if error else 'done',
+        error=error,
+        result_file=result_file,
+        finished_at=_now()
+    )
+
+
+def _get_executor():
+    """The process's worker pool, started on first use"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _init_db()
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='job')
+
+            # Jobs that were running when the last process stopped can't be resumed
+            with closing(_connect()) as conn, conn:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Interrupted (the app restarted)', finished_at = ? "
+                    "WHERE status = 'running'",
+                    [_now()]
+                )
+                queued = conn.execute("SELECT id, kind, args FROM jobs WHERE status = 'queued' ORDER BY id").fetchall()
+
+            # Jobs still waiting are picked up again
+            for job in queued:
+                _executor.submit(_run, job['id'], job['kind'], json.loads(job['args']))
+
+        return _executor
+
+
+def submit(kind, **args):
+    """Queue a job, returns its id
+
+    A job already queued or running with the same kind and arguments is
+    returned instead of queueing a duplicate.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    executor = _get_executor()
+    args_json = json.dumps(args, sort_keys=True)
+
+    with _lock:
+        with closing(_connect()) as conn, conn:
+            existing = conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND args = ? AND status IN ('queued', 'running')",
+                [kind, args_json]
+            ).fetchone()
+            if existing:
+                return existing['id']
+
+            job_id = conn.execute(
+                "INSERT INTO jobs (kind, args, status, created_at) VALUES (?, ?, 'queued', ?)",
+                [kind, args_json, _now()]
+            ).lastrowid
+
+    executor.submit(_run, job_id, kind, args)
+    return job_id
+
+
+def recent_jobs(limit=20):
+    """Newest jobs first, as dicts"""
+    _get_executor()
+    with closing(_connect()) as conn:
+        rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", [limit]).fetchall()
+
+    jobs = []
+    for row in rows:
+        job = dict(row)
+        job['args'] = json.loads(job['args'])
+        job['label'] = JOB_KINDS.get(job['kind'], (job['kind'],))[0]
+        jobs.append(job)
+    return jobs
+
+
+def clear_finished():
+    """Remove finished and failed jobs from the list, and delete their result files"""
+    with closing(_connect()) as conn, conn:
+        cleared = {row['result_file'] for row in conn.execute(
+            "SELECT result_file FROM jobs WHERE status IN ('done', 'failed') AND result_file IS NOT NULL"
+        )}
+        conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed')")
+        # An unchanged report is handed out again, so a listed job may share the file
+        kept = {row['result_file'] for row in conn.execute("SELECT result_file FROM jobs WHERE result_file IS NOT NULL")}
+
+    for path in cleared - kept:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,184 @@
+import gspread
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+import hashlib
+import html
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+from master_snapshot import load_master_snapshot, get_sheet_version
+from api_client import authorize, set_entry_point
+from order_lines import OrderLines, get_order_lines
+from school_sync import read_new_master_rows
+from leaderboards import LiveLeaderboards
+
+# Set up OAuth credentials
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# Leaderboards are served on http://<this computer>:PORT/
+PORT = 8000
+
+# How often MASTER is checked for new orders, and how often displays reload (seconds)
+POLL_INTERVAL = 60
+PAGE_REFRESH = 60
+
+# Edits to existing rows aren't seen by the row-by-row updates (unless
+# they move the watermark row), so totals are rebuilt from the whole sheet
+# this often (seconds)
+FULL_REFRESH_INTERVAL = 30 * 60
+
+def get_credentials():
+    creds = None
+    if os.path.exists('token.pickle'):
+        with open('token.pickle', 'rb') as token:
+            creds = pickle.load(token)
+
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file('client_secret.json', SCOPES)
+            creds = flow.run_local_server(port=0)
+
+        with open('token.pickle', 'wb') as token:
+            pickle.dump(creds, token)
+
+    return creds
+
+def now():
+    return datetime.now().strftime("%B %d, %Y at %I:%M %p")
+
+def full_refresh():
+    """Rebuild every school's totals from the whole MASTER sheet, returns its version"""
+    snapshot = load_master_snapshot(spreadsheet, creds, print)
+    live.reset(get_order_lines(snapshot), now())
+    print(f"  ✓ {len(live.schools())} leaderboards from {live.master_rows} rows")
+    return snapshot.version
+
+def add_new_rows():
+    """Add MASTER rows appended since the last update, False if a full refresh is needed
+
+    A change without new rows (the watermark row still matching) was an
+    edit to existing rows or to another sheet; it's left for the next
+    scheduled full refresh rather than re-reading the whole sheet.
+    """
+    master_sheet = spreadsheet.worksheet('MASTER')
+    state = {'master_rows': live.master_rows, 'schools': {'all': {'master_rows': live.master_rows, 'checksum': live.checksum}}}
+    result = read_new_master_rows(master_sheet, state)
+    if result is None:
+        return False
+
+    headers, start, values = result
+    # values[0] is the header (start 0) or the last row already counted
+    if len(values) < 2:
+        print("  No new rows")
+        return True
+    lines = OrderLines(headers, values[1:], first_row=start + 2)
+    changed = live.add(lines, now())
+    print(f"  ✓ {len(lines)} new rows, {len(changed)} leaderboards changed")
+    return True
+
+def poll(version):
+    """Keep the totals up to date (runs in the background)"""
+    last_full_refresh = time.monotonic()
+
+    while True:
+        time.sleep(POLL_INTERVAL)
+        try:
+            if time.monotonic() - last_full_refresh >= FULL_REFRESH_INTERVAL:
+                version = full_refresh()
+                last_full_refresh = time.monotonic()
+                continue
+
+            # One cheap Drive call when nothing changed
+            current_version = get_sheet_version(spreadsheet, creds)
+            if current_version == version:
+                continue
+
+            print(f"\n[{now()}] MASTER changed, reading new rows...")
+            if not add_new_rows():
+                print("  Existing rows changed - rebuilding from the whole sheet")
+                current_version = full_refresh()
+                last_full_refresh = time.monotonic()
+            version = current_version
+        except Exception as e:
+            print(f"  ⚠️  Update failed, will retry: {e}")
+
+class LeaderboardHandler(BaseHTTPRequestHandler):
+    """Serves leaderboard_{school}.html pages with ETags, so unchanged pages cost a 304"""
+
+    def do_GET(self):
+        path = unquote(urlsplit(self.path).path).lstrip('/')
+
+        if path in ('', 'index.html'):
+            links = ''.join(
+                f'<li><a href="/{quote(filename)}">{html.escape(school)}</a></li>'
+                for school, filename in live.schools()
+            )
+            body = f'<!DOCTYPE html><html><head><meta charset="UTF-8"><title>Leaderboards</title></head><body><h1>Leaderboards</h1><ul>{links}</ul></body></html>'
+            self.send_page('"' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:16] + '"', body)
+            return
+
+        page = live.page(path)
+        if page is None:
+            self.send_error(404)
+            return
+
+        school, etag, body = page
+        self.send_page(etag, body)
+
+    def send_page(self, etag, body):
+        if_none_match = self.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        # Displays must check back (cheaply, with If-None-Match) on every reload
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Classroom displays poll every minute; don't fill the console
+        pass
+
+print("Authenticating...")
+creds = get_credentials()
+print("Authentication successful!")
+
+# Connect to Google Sheets
+set_entry_point('leaderboard_server')
+gc = authorize(creds)
+
+# Open spreadsheet
+spreadsheet = gc.open('MASTER SPRING 2026')
+
+# Running totals, rebuilt from the whole sheet once and then updated with new rows
+live = LiveLeaderboards(refresh_seconds=PAGE_REFRESH)
+version = full_refresh()
+
+threading.Thread(target=poll, args=(version,), name='master-poller', daemon=True).start()
+
+server = ThreadingHTTPServer(('', PORT), LeaderboardHandler)
+print(f"\n✅ Serving leaderboards on http://localhost:{PORT}/")
+print(f"   Checking MASTER for new orders every {POLL_INTERVAL} seconds (Ctrl+C to stop)")
+
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    print("\nStopped.")
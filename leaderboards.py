@@ -0,0 +1,354 @@
+from school_sync import row_checksum
+import hashlib
+import heapq
+import html
+import re
+import threading
+
+# Students shown on each school's leaderboard
+LEADERBOARD_SIZE = 5
+
+MEDALS = ['🥇', '🥈', '🥉', '🌟', '⭐']
+
+PLACEHOLDER = re.compile(r'\{\{(\w+)\}\}')
+
+# Leaderboard page; {{name}} placeholders are filled by render()
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{school_name}} Top Sellers</title>{{refresh}}
+    <style>
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+        
+        body {
+            font-family: 'Arial', sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            padding: 20px;
+            min-height: 100vh;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+        }
+        
+        .leaderboard {
+            background: white;
+            border-radius: 20px;
+            padding: 40px;
+            max-width: 600px;
+            width: 100%;
+            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+        }
+        
+        .header {
+            text-align: center;
+            margin-bottom: 30px;
+        }
+        
+        .header h1 {
+            color: #2d3748;
+            font-size: 2.5em;
+            margin-bottom: 10px;
+        }
+        
+        .header .trophy {
+            font-size: 3em;
+            margin-bottom: 10px;
+        }
+        
+        .header .subtitle {
+            color: #718096;
+            font-size: 1.1em;
+        }
+        
+        .student {
+            display: flex;
+            align-items: center;
+            padding: 20px;
+            margin-bottom: 15px;
+            border-radius: 15px;
+            transition: transform 0.3s ease, box-shadow 0.3s ease;
+            position: relative;
+        }
+        
+        .student:hover {
+            transform: translateY(-5px);
+            box-shadow: 0 10px 25px rgba(0,0,0,0.1);
+        }
+        
+        .rank-1 {
+            background: linear-gradient(135deg, #ffd700 0%, #ffed4e 100%);
+            border: 3px solid #d4af37;
+        }
+        
+        .rank-2 {
+            background: linear-gradient(135deg, #c0c0c0 0%, #e8e8e8 100%);
+            border: 3px solid #a8a8a8;
+        }
+        
+        .rank-3 {
+            background: linear-gradient(135deg, #cd7f32 0%, #e9a76b 100%);
+            border: 3px solid #b87333;
+        }
+        
+        .rank-4, .rank-5 {
+            background: linear-gradient(135deg, #e0e7ff 0%, #f0f4ff 100%);
+            border: 3px solid #c7d2fe;
+        }
+        
+        .rank {
+            font-size: 2em;
+            font-weight: bold;
+            width: 60px;
+            text-align: center;
+            color: #2d3748;
+        }
+        
+        .info {
+            flex: 1;
+            padding: 0 20px;
+        }
+        
+        .name {
+            font-size: 1.4em;
+            font-weight: bold;
+            color: #2d3748;
+            margin-bottom: 5px;
+        }
+        
+        .grade {
+            color: #718096;
+            font-size: 1em;
+        }
+        
+        .sales {
+            font-size: 1.6em;
+            font-weight: bold;
+            color: #2d3748;
+            white-space: nowrap;
+            margin-right: 10px;
+        }
+        
+        .medal {
+            font-size: 2.5em;
+        }
+        
+        .updated {
+            text-align: center;
+            color: #718096;
+            font-size: 0.9em;
+            margin-top: 30px;
+        }
+        
+        @media (max-width: 600px) {
+            .leaderboard {
+                padding: 20px;
+            }
+            
+            .header h1 {
+                font-size: 1.8em;
+            }
+            
+            .name {
+                font-size: 1.1em;
+            }
+            
+            .sales {
+                font-size: 1.3em;
+            }
+            
+            .rank {
+                font-size: 1.5em;
+                width: 40px;
+            }
+        }
+    </style>
+</head>
+<body>
+    <div class="leaderboard">
+        <div class="header">
+            <div class="trophy">🏆</div>
+            <h1>Top Sellers</h1>
+            <div class="subtitle">{{school_name}}</div>
+        </div>
+        
+{{students}}
+        
+        <div class="updated">
+            Last updated: {{timestamp}}
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# One student's row, repeated into the page's {{students}}
+STUDENT_ROW = """
+        <div class="student rank-{{rank}}">
+            <div class="rank">#{{rank}}</div>
+            <div class="info">
+                <div class="name">{{name}}</div>
+                <div class="grade">Grade {{grade}}</div>
+            </div>
+            <div class="sales">{{sales}}</div>
+            <div class="medal">{{medal}}</div>
+        </div>
+"""
+
+
+def compile_template(text):
+    """Split a template on its placeholders once: [text, name, text, name, ..., text]"""
+    return PLACEHOLDER.split(text)
+
+
+def render(parts, values):
+    """Fill a compiled template (values are inserted as-is)"""
+    filled = list(parts)
+    filled[1::2] = [values[name] for name in parts[1::2]]
+    return ''.join(filled)
+
+
+# Compiled once per process; rendering a page only joins strings
+PAGE_PARTS = compile_template(PAGE)
+STUDENT_ROW_PARTS = compile_template(STUDENT_ROW)
+
+# Changes when the page layout does (so saved pages are rebuilt)
+TEMPLATE_CHECKSUM = hashlib.sha1((PAGE + STUDENT_ROW).encode('utf-8')).hexdigest()[:12]
+
+
+def top_students(students, k=LEADERBOARD_SIZE):
+    """The k students with the highest totals, [(name, {'grade', 'total'})], highest first
+
+    Keeps a k-sized heap instead of sorting every student; ties keep the
+    students' original order, like a stable sort would.
+    """
+    return heapq.nlargest(k, students.items(), key=lambda item: item[1]['total'])
+
+
+def leaderboard_html(school_name, top, timestamp, refresh_seconds=None):
+    """Leaderboard page for a school's top students
+
+    With refresh_seconds the browser reloads the page that often (for
+    pages served by leaderboard_server.py).
+    """
+    rows = [
+        render(STUDENT_ROW_PARTS, {
+            'rank': str(rank),
+            'name': html.escape(name),
+            'grade': html.escape(data['grade']),
+            'sales': f"${data['total']:,.2f}",
+            'medal': MEDALS[rank - 1] if rank <= len(MEDALS) else ''
+        })
+        for rank, (name, data) in enumerate(top, 1)
+    ]
+    return render(PAGE_PARTS, {
+        'school_name': html.escape(school_name),
+        'students': ''.join(rows),
+        'timestamp': timestamp,
+        'refresh': f'\n    <meta http-equiv="refresh" content="{refresh_seconds}">' if refresh_seconds else ''
+    })
+
+
+def leaderboard_filename(school_name):
+    """leaderboard_{school}.html, with spaces and slashes replaced"""
+    safe_school_name = school_name.replace(' ', '_').replace('/', '_')
+    return f"leaderboard_{safe_school_name}.html"
+
+
+def add_totals(totals, lines):
+    """Add order lines to {school: {student: {'grade', 'total'}}}, returns the schools changed"""
+    changed = set()
+    for school, student, grade, line_total in zip(lines.school, lines.student, lines.grade, lines.line_total):
+        if not school or not student:
+            continue
+        data = totals.setdefault(school, {}).setdefault(student, {'grade': grade, 'total': 0.0})
+        data['total'] += line_total
+        changed.add(school)
+    return changed
+
+
+class LiveLeaderboards:
+    """Per-school running sales totals and rendered pages, updated row by row
+
+    Only schools that got new order lines are re-ranked, and a page (with
+    its ETag and "Last updated" time) only changes when its top students do.
+    reset() and add() are called from one updating thread; page() and
+    schools() can be called from any thread.
+    """
+
+    def __init__(self, refresh_seconds=None):
+        self.refresh_seconds = refresh_seconds
+        self.lock = threading.Lock()
+        self.totals = {}  # {school: {student: {'grade', 'total'}}}
+        self.rankings = {}  # {school: top students}
+        self.pages = {}  # {filename: (school, etag, html)}
+        # MASTER data rows counted so far, and a checksum of the last one
+        self.master_rows = 0
+        self.checksum = ''
+
+    def _page(self, school, top, timestamp):
+        page = leaderboard_html(school, top, timestamp, self.refresh_seconds)
+        etag = '"' + hashlib.sha1(page.encode('utf-8')).hexdigest()[:16] + '"'
+        return school, etag, page
+
+    def reset(self, lines, timestamp):
+        """Rebuild everything from all MASTER order lines
+
+        The new totals and pages are built while the current ones are still
+        served, then swapped in at once. Schools whose top students didn't
+        change keep their page and ETag, so displays get a 304.
+        """
+        totals = {}
+        add_totals(totals, lines)
+        rankings = {school: [(name, dict(data)) for name, data in top_students(students)] for school, students in totals.items()}
+
+        pages = {}
+        for school, top in rankings.items():
+            filename = leaderboard_filename(school)
+            if top == self.rankings.get(school) and filename in self.pages:
+                pages[filename] = self.pages[filename]
+            else:
+                pages[filename] = self._page(school, top, timestamp)
+
+        with self.lock:
+            self.totals = totals
+            self.rankings = rankings
+            self.pages = pages
+            self.master_rows = len(lines)
+            self.checksum = row_checksum(lines.source_rows[-1]) if len(lines) else ''
+
+    def add(self, lines, timestamp):
+        """Add order lines that follow the ones already counted, returns the schools whose ranking changed"""
+        with self.lock:
+            changed = add_totals(self.totals, lines)
+
+            if len(lines):
+                self.master_rows += len(lines)
+                self.checksum = row_checksum(lines.source_rows[-1])
+
+            re_ranked = []
+            for school in changed:
+                top = top_students(self.totals[school])
+                if top != self.rankings.get(school):
+                    self.rankings[school] = [(name, dict(data)) for name, data in top]
+                    re_ranked.append(school)
+
+            for school in re_ranked:
+                self.pages[leaderboard_filename(school)] = self._page(school, self.rankings[school], timestamp)
+
+        return re_ranked
+
+    def page(self, filename):
+        """(school, etag, html) for a leaderboard file name, or None"""
+        with self.lock:
+            return self.pages.get(filename)
+
+    def schools(self):
+        """[(school, filename)] sorted by school"""
+        with self.lock:
+            return sorted((school, filename) for filename, (school, _, _) in self.pages.items())
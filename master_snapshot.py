@@ -0,0 +1,141 @@
+import client_pool
+from contextlib import contextmanager
+import gzip
+import os
+import pickle
+import tempfile
+import threading
+
+# Local cache for downloaded MASTER sheet snapshots
+CACHE_DIR = '.order_cache'
+
+@contextmanager
+def replace_file(path, mode='w'):
+    """Write to a temp file of its own next to path, then move it over path
+
+    Each writer gets a unique temp file, so concurrent jobs and threads
+    saving the same cache never write into each other's file; the last
+    one to finish wins. Nothing is replaced if the block fails.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with open(fd, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Snapshots already loaded by this process, keyed by spreadsheet id
+_loaded_snapshots = {}
+_snapshot_lock = threading.Lock()
+
+
+class MasterSnapshot:
+    """Read-only copy of the MASTER sheet, stored column by column"""
+
+    __slots__ = ('spreadsheet_id', 'version', 'headers', 'columns', 'row_count', '_rows', 'cache')
+
+    def __init__(self, spreadsheet_id, version, headers, columns):
+        self.spreadsheet_id = spreadsheet_id
+        self.version = version
+        self.headers = headers
+        self.columns = columns
+        self.row_count = len(columns[0]) if columns else 0
+        self._rows = None
+        # Structures derived from this snapshot (order lines, totals, ...)
+        self.cache = {}
+
+    @classmethod
+    def from_values(cls, spreadsheet_id, version, values):
+        """Build a snapshot from get_all_values() output"""
+        headers = list(values[0]) if values else []
+        rows = values[1:]
+        width = max([len(headers)] + [len(row) for row in rows])
+
+        headers += [''] * (width - len(headers))
+        columns = [[] for _ in range(width)]
+
+        for row in rows:
+            for col_idx in range(width):
+                columns[col_idx].append(row[col_idx] if col_idx < len(row) else '')
+
+        return cls(spreadsheet_id, version, headers, columns)
+
+    @property
+    def rows(self):
+        """Data rows (without the header), built once and shared by every report"""
+        if self._rows is None:
+            self._rows = [list(row) for row in zip(*self.columns)]
+        return self._rows
+
+
+def get_sheet_version(spreadsheet, creds):
+    """Get the Drive revision of a spreadsheet (changes on every edit)"""
+    with client_pool.service(creds, 'drive', 'v3') as drive_service:
+        metadata = drive_service.files().get(
+            fileId=spreadsheet.id,
+            fields='version, modifiedTime'
+        ).execute()
+    return f"{metadata.get('version')}:{metadata.get('modifiedTime')}"
+
+
+def _cache_path(spreadsheet_id):
+    return os.path.join(CACHE_DIR, f"master_{spreadsheet_id}.pkl.gz")
+
+
+def _read_cached_snapshot(spreadsheet_id):
+    path = _cache_path(spreadsheet_id)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with gzip.open(path, 'rb') as f:
+            stored = pickle.load(f)
+        return MasterSnapshot(stored['spreadsheet_id'], stored['version'], stored['headers'], stored['columns'])
+    except Exception:
+        # Corrupt or outdated cache file - download again
+        return None
+
+
+def _write_cached_snapshot(snapshot):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(snapshot.spreadsheet_id)
+
+    with replace_file(path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+        pickle.dump({
+            'spreadsheet_id': snapshot.spreadsheet_id,
+            'version': snapshot.version,
+            'headers': snapshot.headers,
+            'columns': snapshot.columns
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_master_snapshot(spreadsheet, creds, log=None):
+    """Return the MASTER sheet snapshot, downloading it only if the sheet changed"""
+    log = log or (lambda message: None)
+    version = get_sheet_version(spreadsheet, creds)
+
+    with _snapshot_lock:
+        snapshot = _loaded_snapshots.get(spreadsheet.id)
+
+        if snapshot is None or snapshot.version != version:
+            snapshot = _read_cached_snapshot(spreadsheet.id)
+
+            if snapshot is None or snapshot.version != version:
+                log("Reading MASTER sheet...")
+                data = spreadsheet.worksheet('MASTER').get_all_values()
+                snapshot = MasterSnapshot.from_values(spreadsheet.id, version, data)
+                _write_cached_snapshot(snapshot)
+            else:
+                log("Using cached MASTER sheet (unchanged since last download)")
+
+            _loaded_snapshots[spreadsheet.id] = snapshot
+        else:
+            log("Using cached MASTER sheet (unchanged since last download)")
+
+    return snapshot
@@ -0,0 +1,79 @@
+from fuzzywuzzy import fuzz
+import numpy as np
+
+# Names at least this similar (but not identical) are flagged as possible typos
+MIN_SIMILARITY = 70
+
+
+def letter_counts(names):
+    """How often each character appears in each name, as a (names x characters) array"""
+    columns = {}
+    for name in names:
+        for letter in name:
+            columns.setdefault(letter, len(columns))
+
+    counts = np.zeros((len(names), max(1, len(columns))), dtype=np.int16)
+    for i, name in enumerate(names):
+        for letter in name:
+            counts[i, columns[letter]] += 1
+    return counts
+
+
+def candidate_pairs(names, min_similarity=MIN_SIMILARITY, new=None):
+    """Sorted index pairs (i, j), i < j, of names sharing enough letters to match
+
+    fuzz.ratio is at most 2 * (letters in common, counting repeats) / (total
+    length), so pairs below that bound can't match and are never compared.
+    Nothing fuzz.ratio would match is left out. With new (indexes), only
+    pairs with at least one of those names are returned.
+    """
+    counts = letter_counts(names)
+    lengths = counts.sum(axis=1)
+    pairs = []
+
+    if new is None:
+        for i in range(len(names) - 1):
+            shared = np.minimum(counts[i], counts[i + 1:]).sum(axis=1)
+            possible = 200 * shared >= (min_similarity - 0.5) * (lengths[i] + lengths[i + 1:])
+            pairs.extend((i, int(j)) for j in np.flatnonzero(possible) + i + 1)
+        return pairs
+
+    new = set(new)
+    for i in new:
+        shared = np.minimum(counts[i], counts).sum(axis=1)
+        possible = 200 * shared >= (min_similarity - 0.5) * (lengths[i] + lengths)
+        for j in map(int, np.flatnonzero(possible)):
+            # Pairs of two new names are found from the lower index only
+            if j != i and (j not in new or j > i):
+                pairs.append((min(i, j), max(i, j)))
+    return sorted(pairs)
+
+
+def similar_names(names, min_similarity=MIN_SIMILARITY, compared=(), matches=()):
+    """Pairs of names with min_similarity <= fuzz.ratio < 100, ignoring case
+
+    Only names sharing enough letters to match are compared with fuzz.ratio,
+    a cheap array bound that rules out most pairs. Returns
+    [(i, j, similarity)] as indexes into names, in the order a pairwise loop
+    would find them.
+
+    compared and matches come from an earlier call: the names it was given
+    and its result as (name1, name2, similarity). Pairs of names that were
+    both compared then aren't scored again.
+    """
+    lowered = [name.lower() for name in names]
+    position = {name: i for i, name in enumerate(names)}
+    compared = set(compared)
+
+    found = []
+    for name1, name2, similarity in matches:
+        if name1 in position and name2 in position:
+            i, j = sorted((position[name1], position[name2]))
+            found.append((i, j, similarity))
+
+    new = [i for i, name in enumerate(names) if name not in compared]
+    for i, j in candidate_pairs(lowered, min_similarity, new=new if compared else None):
+        similarity = fuzz.ratio(lowered[i], lowered[j])
+        if min_similarity <= similarity < 100:
+            found.append((i, j, similarity))
+    return sorted(found)
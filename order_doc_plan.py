@@ -0,0 +1,125 @@
+from master_snapshot import CACHE_DIR, replace_file
+from order_forms import template_values, bag_summary
+import json
+import os
+import re
+
+# Style of the popcorn/coffee summary inserted under the items table
+SUMMARY_STYLE = {
+    'bold': True,
+    'fontSize': {'magnitude': 12, 'unit': 'PT'},
+    'weightedFontFamily': {
+        'fontFamily': 'Lexend',
+        'weight': 700
+    }
+}
+
+
+def _table_text(table):
+    text = ""
+    for row in table.get('tableRows', []):
+        for cell in row.get('tableCells', []):
+            for cell_content in cell.get('content', []):
+                for elem in cell_content.get('paragraph', {}).get('elements', []):
+                    text += elem.get('textRun', {}).get('content', '')
+    return text
+
+
+def find_items_table(document):
+    """Layout of the "Quantity / Flavor" items table in a Google Doc
+
+    Returns {'start', 'end', 'rows'} (document indices and row count),
+    or None if the document has no items table.
+    """
+    for element in document.get('body', {}).get('content', []):
+        table = element.get('table')
+        if table and 'Quantity' in _table_text(table) and 'Flavor' in _table_text(table):
+            return {
+                'start': element.get('startIndex'),
+                'end': element.get('endIndex'),
+                'rows': len(table.get('tableRows', []))
+            }
+    return None
+
+
+def _cache_path(template_id, modified_time):
+    stamp = re.sub(r'[^0-9A-Za-z]', '', modified_time or '')
+    return os.path.join(CACHE_DIR, f"doc_layout_{template_id}_{stamp}.json")
+
+
+def load_template_layout(docs_service, template_id, modified_time, execute=None):
+    """Items table layout of the template, read once per template revision"""
+    path = _cache_path(template_id, modified_time)
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    request = docs_service.documents().get(documentId=template_id)
+    document = execute(request) if execute else request.execute()
+    layout = {'items_table': find_items_table(document)}
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with replace_file(path) as f:
+        json.dump(layout, f)
+
+    return layout
+
+
+def order_doc_requests(layout, order):
+    """Every edit for one order's copy of the template, for a single batchUpdate
+
+    Requests in a batchUpdate run in order, so the index-based edits (summary
+    after the items table, then the unused table rows) come first, while the
+    document still has the template's indices. Placeholders are replaced last
+    with replaceAllText, which doesn't depend on indices.
+    """
+    requests = []
+    table = layout.get('items_table')
+
+    if table:
+        summary_text = f"\n\n{bag_summary(order)}\n"
+        # Docs indices count UTF-16 code units
+        summary_length = len(summary_text.encode('utf-16-le')) // 2
+
+        requests.append({
+            'insertText': {
+                'location': {'index': table['end']},
+                'text': summary_text
+            }
+        })
+        requests.append({
+            'updateTextStyle': {
+                'range': {
+                    'startIndex': table['end'],
+                    'endIndex': table['end'] + summary_length
+                },
+                'textStyle': SUMMARY_STYLE,
+                'fields': 'bold,fontSize,weightedFontFamily'
+            }
+        })
+
+        # Delete empty item rows (row 0 is the header)
+        num_items = len(order['items'])
+        for _ in range(table['rows'] - (num_items + 1)):
+            requests.append({
+                'deleteTableRow': {
+                    'tableCellLocation': {
+                        'tableStartLocation': {'index': table['start']},
+                        'rowIndex': num_items + 1,
+                        'columnIndex': 0
+                    }
+                }
+            })
+
+    for placeholder, value in template_values(order).items():
+        requests.append({
+            'replaceAllText': {
+                'containsText': {'text': placeholder, 'matchCase': True},
+                'replaceText': value
+            }
+        })
+
+    return requests
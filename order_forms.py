@@ -0,0 +1,340 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+import os
+import threading
+
+# Item rows in the order form template ({{quantity1}} ... {{quantity13}})
+TEMPLATE_ITEM_ROWS = 13
+
+# Column indices in "{school} MASTER" sheets
+col_order_num = 0
+col_student = 1
+col_grade = 2
+col_quantity = 3
+col_flavor = 4
+col_price = 5
+col_delivery = 6
+col_billing = 7
+col_school = 8
+
+
+def grade_sort_key(grade):
+    """Sort kindergarten first, then grades in number order, then anything else"""
+    grade_upper = grade.upper().strip()
+    if grade_upper == 'K' or grade_upper.startswith('KINDER'):
+        return (0, '')
+    if grade_upper.isdigit():
+        return (int(grade_upper), '')
+    if grade_upper and grade_upper[0].isdigit():
+        return (int(grade_upper[0]), grade_upper)
+    return (999, grade_upper)
+
+
+def is_pickup_row(row):
+    """True for school sheet rows picked up at school (these get order forms)"""
+    return len(row) > col_delivery and row[col_delivery] == 'Pick-up at school'
+
+
+def group_orders(rows):
+    """Group school sheet rows into orders, sorted by grade then student name"""
+    orders = {}
+
+    for row in rows:
+        order_num = row[col_order_num]
+        quantity = int(row[col_quantity]) if row[col_quantity].isdigit() else 0
+        flavor = row[col_flavor]
+
+        if order_num not in orders:
+            orders[order_num] = {
+                'order_number': order_num,
+                'billing_name': row[col_billing] if len(row) > col_billing else '',
+                'school': row[col_school] if len(row) > col_school else '',
+                'student_name': row[col_student] if len(row) > col_student else '',
+                'student_grade': row[col_grade] if len(row) > col_grade else '',
+                'items': []
+            }
+
+        orders[order_num]['items'].append({'flavor': flavor, 'quantity': quantity})
+
+    return sorted(
+        orders.values(),
+        key=lambda order: (grade_sort_key(order['student_grade']), order['student_name'])
+    )
+
+
+def bag_counts(order):
+    """Popcorn and coffee bags in an order (anything not coffee is popcorn)"""
+    popcorn_count = 0
+    coffee_count = 0
+
+    for item in order['items']:
+        if 'coffee' in item['flavor'].lower():
+            coffee_count += item['quantity']
+        else:
+            popcorn_count += item['quantity']
+
+    return popcorn_count, coffee_count
+
+
+def bag_summary(order):
+    """The "Popcorn: N bags     Coffee: N bags" line under the items table"""
+    popcorn_count, coffee_count = bag_counts(order)
+    popcorn_label = "bag" if popcorn_count == 1 else "bags"
+    coffee_label = "bag" if coffee_count == 1 else "bags"
+    return f"Popcorn: {popcorn_count} {popcorn_label}     Coffee: {coffee_count} {coffee_label}"
+
+
+def order_form_styles():
+    """Paragraph styles for ReportLab order forms"""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'OrderTitle',
+            parent=styles['Heading1'],
+            fontSize=20,
+            textColor=colors.HexColor('#1a1a1a'),
+            spaceAfter=16,
+            alignment=1  # Center
+        ),
+        'field': ParagraphStyle(
+            'OrderField',
+            parent=styles['Normal'],
+            fontSize=12,
+            leading=18
+        ),
+        'summary': ParagraphStyle(
+            'OrderSummary',
+            parent=styles['Normal'],
+            fontName='Helvetica-Bold',
+            fontSize=12,
+            spaceBefore=14
+        )
+    }
+
+
+def order_form_story(order, styles):
+    """ReportLab flowables for one order form (header, items table, bag summary)"""
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+    from xml.sax.saxutils import escape
+
+    story = [Paragraph("Order Form", styles['title'])]
+
+    for label, value in [
+        ('Order Number', order['order_number']),
+        ('Student', order['student_name']),
+        ('Grade', order['student_grade']),
+        ('School', order['school']),
+        ('Billing Name', order['billing_name'])
+    ]:
+        story.append(Paragraph(f"<b>{label}:</b> {escape(value)}", styles['field']))
+
+    story.append(Spacer(1, 0.25 * inch))
+
+    # One row per item, so there are no empty rows to remove
+    table_data = [['Quantity', 'Flavor']]
+    for item in order['items']:
+        table_data.append([str(item['quantity']), item['flavor']])
+
+    table = Table(table_data, colWidths=[1.2*inch, 5*inch], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#333333')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 11),
+        ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(table)
+
+    story.append(Paragraph(bag_summary(order), styles['summary']))
+    return story
+
+
+def write_order_form_pdf(order, pdf_path):
+    """Lay out one order form straight to PDF with ReportLab (no Word needed)"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate
+
+    doc = SimpleDocTemplate(pdf_path, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
+    doc.build(order_form_story(order, order_form_styles()))
+
+
+def write_order_forms_pdf(orders, pdf_file):
+    """Lay out every order into one PDF in a single pass, each on its own page
+
+    pdf_file is a path or a file-like object. Fonts and styles are shared
+    by all pages instead of being embedded once per order.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, PageBreak
+
+    styles = order_form_styles()
+    story = []
+    for order_idx, order in enumerate(orders):
+        if order_idx:
+            story.append(PageBreak())
+        story.extend(order_form_story(order, styles))
+
+    doc = SimpleDocTemplate(pdf_file, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
+    doc.build(story)
+
+
+def template_values(order):
+    """Values for the Word template's placeholders for one order"""
+    values = {
+        '{{Order Number}}': order['order_number'],
+        '{{Billing Name}}': order['billing_name'],
+        '{{Student name}}': order['student_name'],
+        '{{student name}}': order['student_name'],
+        '{{Grade}}': order['student_grade'],
+        '{{School}}': order['school']
+    }
+
+    # Item quantities and flavors, blank for unused rows
+    for i in range(1, TEMPLATE_ITEM_ROWS + 1):
+        if i <= len(order['items']):
+            item = order['items'][i - 1]
+            values[f'{{{{quantity{i}}}}}'] = str(item['quantity'])
+            values[f'{{{{flavor name{i}}}}}'] = item['flavor']
+        else:
+            values[f'{{{{quantity{i}}}}}'] = ''
+            values[f'{{{{flavor name{i}}}}}'] = ''
+
+    return values
+
+
+# Compiled Word template in a pool worker process, set once by
+# _init_renderer instead of being pickled into every job
+_template = None
+
+# docx2pdf drives one Word instance; jobs running side by side take turns
+_word_lock = threading.Lock()
+
+
+def _init_renderer(template):
+    global _template
+    _template = template
+
+
+def _render_in_worker(job):
+    return render_order_pdf(job, _template)
+
+
+def render_order_pdf(job, template=None):
+    """Render one order to PDF, returns (order_idx, pdf_path, error)
+
+    Uses the compiled Word template (through docx2pdf) when template is
+    given, otherwise lays the form out with ReportLab.
+    """
+    order_idx, order, work_dir = job
+    temp_docx = os.path.join(work_dir, f"temp_order_{order_idx}.docx")
+    temp_pdf = os.path.join(work_dir, f"temp_order_{order_idx}.pdf")
+
+    if template is None:
+        try:
+            write_order_form_pdf(order, temp_pdf)
+            return order_idx, temp_pdf, None
+        except Exception as e:
+            return order_idx, None, str(e)
+
+    try:
+        from docx2pdf import convert
+
+        template.fill(template_values(order), temp_docx)
+        with _word_lock:
+            convert(temp_docx, temp_pdf)
+        return order_idx, temp_pdf, None
+    except Exception as e:
+        return order_idx, None, str(e)
+    finally:
+        try:
+            os.remove(temp_docx)
+        except OSError:
+            pass
+
+
+def render_order_pdfs(orders, template, work_dir, max_workers=None):
+    """Render orders, yielding results in the orders' order
+
+    ReportLab forms are rendered across a process pool. Word template forms
+    are rendered one at a time in this process: docx2pdf drives Word, and
+    parallel conversions fight over the same Word instance.
+    """
+    jobs = [(order_idx, order, work_dir) for order_idx, order in enumerate(orders)]
+
+    if template is not None:
+        max_workers = 1
+    if max_workers == 1:
+        yield from map(partial(render_order_pdf, template=template), jobs)
+        return
+
+    # Each worker gets the template once, through the initializer
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_renderer, initargs=(template,)) as executor:
+        # map() hands results back in submission order as soon as each is ready
+        yield from executor.map(_render_in_worker, jobs)
+
+
+def write_packet(job):
+    """Worker process: write one school's combined PDF, returns (school, pdf_path, error)"""
+    school, orders, pdf_path = job
+    try:
+        write_order_forms_pdf(orders, pdf_path)
+        return school, pdf_path, None
+    except Exception as e:
+        return school, None, str(e)
+
+
+def write_packets(packets, template=None, work_dir=None, max_workers=None):
+    """Write one combined PDF per school, with all schools built in parallel
+
+    packets is a list of (school, orders, pdf_path). Yields (school, pdf_path,
+    error) as each school finishes. With a Word template, orders are
+    converted one at a time (see render_order_pdfs) and merged per school
+    (work_dir holds the per-order PDFs).
+    """
+    if template is None:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(write_packet, packet) for packet in packets]
+            for future in as_completed(futures):
+                yield future.result()
+        return
+
+    from PyPDF2 import PdfMerger
+
+    all_orders = [order for _, orders, _ in packets for order in orders]
+    results = render_order_pdfs(all_orders, template, work_dir, max_workers=max_workers)
+
+    # Results come back in order, so each school's orders arrive together
+    for school, orders, pdf_path in packets:
+        merger = PdfMerger()
+        order_pdfs = []
+        for _ in orders:
+            _, order_pdf, error = next(results)
+            if order_pdf:
+                merger.append(order_pdf)
+                order_pdfs.append(order_pdf)
+
+        if order_pdfs:
+            merger.write(pdf_path)
+        merger.close()
+
+        for order_pdf in order_pdfs:
+            try:
+                os.remove(order_pdf)
+            except OSError:
+                pass
+
+        if order_pdfs:
+            yield school, pdf_path, None
+        else:
+            yield school, None, "No PDFs were generated successfully"
@@ -0,0 +1,103 @@
+from array import array
+
+# MASTER sheet fields: header names to look for, and the column each field
+# has always been in (used when no header matches)
+FIELDS = {
+    'order_number': (('order id', 'order number', 'order #'), 0),          # A
+    'delivery': (('shipping method', 'delivery method'), 14),             # O
+    'quantity': (('lineitem quantity', 'quantity', 'qty'), 16),           # Q
+    'flavor': (('lineitem name', 'flavor', 'item name', 'product'), 17),  # R
+    'price': (('lineitem price', 'price', 'price per item'), 18),         # S
+    'billing_name': (('billing name',), 24),                              # Y
+    'school': (('school', 'school name'), 47),                            # AV
+    'student': (('student name', 'student'), 48),                         # AW
+    'teacher': (('teacher', 'teacher name'), 49),                         # AX
+    'grade': (('grade', 'student grade'), 50),                            # AY
+}
+
+# Columns copied to each "{school} MASTER" sheet, in order (A, AW, AY, Q, R, S, O, Y, AV)
+SCHOOL_SHEET_FIELDS = ['order_number', 'student', 'grade', 'quantity', 'flavor', 'price', 'delivery', 'billing_name', 'school']
+
+TEXT_FIELDS = ('order_number', 'delivery', 'flavor', 'billing_name', 'school', 'student', 'teacher', 'grade')
+
+
+def resolve_columns(headers):
+    """Map each field to its column index using the header row"""
+    normalized = [header.strip().lower() for header in headers]
+    columns = {}
+
+    for field, (names, default_index) in FIELDS.items():
+        columns[field] = default_index
+        for name in names:
+            if name in normalized:
+                columns[field] = normalized.index(name)
+                break
+
+    return columns
+
+
+def parse_quantity(value):
+    """Parse a quantity cell, 0 if it isn't a whole number"""
+    value = value.strip()
+    return int(value) if value.isdigit() else 0
+
+
+def parse_price(value):
+    """Parse a price cell like '$1,234.50', 0.0 if it isn't a number"""
+    try:
+        return float(value.replace('$', '').replace(',', '').strip())
+    except ValueError:
+        return 0.0
+
+
+class OrderLines:
+    """Parsed order lines from a MASTER snapshot, one list/array per field
+
+    Text fields are stripped strings, quantity is an int array and
+    price / line_total are float arrays. Line i came from sheet row
+    row_numbers[i] (1-based, header is row 1, so the first data row is 2
+    unless the lines were built from a later slice of the sheet).
+    """
+
+    __slots__ = ('columns', 'headers', 'source_rows', 'row_numbers', 'quantity', 'price', 'line_total') + TEXT_FIELDS
+
+    def __init__(self, headers, rows, first_row=2):
+        self.headers = headers
+        self.source_rows = rows
+        self.columns = resolve_columns(headers)
+
+        for field in TEXT_FIELDS:
+            col = self.columns[field]
+            setattr(self, field, [row[col].strip() if len(row) > col else '' for row in rows])
+
+        col_quantity = self.columns['quantity']
+        col_price = self.columns['price']
+        self.quantity = array('l', (parse_quantity(row[col_quantity]) if len(row) > col_quantity else 0 for row in rows))
+        self.price = array('d', (parse_price(row[col_price]) if len(row) > col_price else 0.0 for row in rows))
+        self.line_total = array('d', (quantity * price for quantity, price in zip(self.quantity, self.price)))
+        self.row_numbers = range(first_row, len(rows) + first_row)
+
+    def __len__(self):
+        return len(self.source_rows)
+
+    def raw(self, field, idx):
+        """Unparsed cell value of a field for line idx"""
+        row = self.source_rows[idx]
+        col = self.columns[field]
+        return row[col] if len(row) > col else ''
+
+    def school_sheet_row(self, idx):
+        """Line idx laid out for a school sheet (see SCHOOL_SHEET_FIELDS)"""
+        return [self.raw(field, idx) for field in SCHOOL_SHEET_FIELDS]
+
+    def header(self, field):
+        """Header text of the column a field was read from"""
+        col = self.columns[field]
+        return self.headers[col] if col < len(self.headers) else ''
+
+
+def get_order_lines(snapshot):
+    """Order lines for a snapshot, parsed once and shared by every report"""
+    if 'order_lines' not in snapshot.cache:
+        snapshot.cache['order_lines'] = OrderLines(snapshot.headers, snapshot.rows)
+    return snapshot.cache['order_lines']
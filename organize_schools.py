@@ -4,6 +4,17 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 import os
 import pickle
+import sys
+from master_snapshot import load_master_snapshot
+from api_client import authorize, set_entry_point
+from order_lines import get_order_lines, SCHOOL_SHEET_FIELDS
+from sheets_batch import SheetsBatch
+from row_highlights import fetch_row_colors, highlight_requests
+from build_tracker import BuildTracker, SCHOOL_SHEET, school_digests
+from school_sync import (
+    load_sync_state, save_sync_state, sync_new_orders, record_full_sync,
+    school_color, order_sort_key, HEADER_FORMAT
+)
 
 # Set up OAuth credentials
 SCOPES = [
@@ -34,194 +45,152 @@ creds = get_credentials()
 print("Authentication successful!")
 
 # Connect to Google Sheets
-gc = gspread.authorize(creds)
+set_entry_point('organize_schools')
+gc = authorize(creds)
 
 # Open spreadsheet
 spreadsheet = gc.open('MASTER SPRING 2026')
 master_sheet = spreadsheet.worksheet('MASTER')
 
-print(f"Reading MASTER sheet...")
+# Incremental mode: only push rows added since the last run
+# (run with --full to re-read MASTER and re-check every school sheet)
+sync_state = load_sync_state(spreadsheet.id)
 
-# Get all data
-all_data = master_sheet.get_all_values()
-headers = all_data[0]
-rows = all_data[1:]
+if '--full' not in sys.argv and sync_new_orders(spreadsheet, master_sheet, sync_state, print):
+    print(f"\n✅ COMPLETE!")
+    print("School sheets are up to date")
+    exit()
+
+# Get all data (downloaded only if the sheet changed since the last run)
+snapshot = load_master_snapshot(spreadsheet, creds, print)
+rows = snapshot.rows
 
 print(f"Found {len(rows)} rows")
 
-# Column indices (0-based)
-col_A = 0   # Order Number
-col_O = 14  # Shipping Method
-col_Q = 16  # Quantity
-col_R = 17  # Flavor
-col_S = 18  # Price per item
-col_Y = 24  # Billing Name
-col_AV = 47 # School
-col_AW = 48 # Student Name
-col_AY = 50 # Grade
-
-# Define readable pastel colors for highlighting
-SCHOOL_COLORS = [
-    {'red': 1.0, 'green': 0.9, 'blue': 0.9},     # Light pink
-    {'red': 0.9, 'green': 1.0, 'blue': 0.9},     # Light green
-    {'red': 0.9, 'green': 0.9, 'blue': 1.0},     # Light blue
-    {'red': 1.0, 'green': 1.0, 'blue': 0.9},     # Light yellow
-    {'red': 1.0, 'green': 0.9, 'blue': 1.0},     # Light purple
-    {'red': 0.9, 'green': 1.0, 'blue': 1.0},     # Light cyan
-    {'red': 1.0, 'green': 0.95, 'blue': 0.9},    # Light peach
-    {'red': 0.95, 'green': 0.95, 'blue': 1.0},   # Light lavender
-    {'red': 0.9, 'green': 1.0, 'blue': 0.95},    # Light mint
-    {'red': 1.0, 'green': 0.9, 'blue': 0.95},    # Light coral
-]
+# Parsed order lines (columns resolved from the header row)
+lines = get_order_lines(snapshot)
 
 # Group orders by school
 schools = {}
 school_color_map = {}
-color_index = 0
 
-for idx, row in enumerate(rows):
-    if len(row) > col_AV:
-        school_name = row[col_AV].strip()
+for idx, school_name in enumerate(lines.school):
+    if school_name:
+        # Assign color if new school (same color as on previous runs)
+        if school_name not in school_color_map:
+            school_color_map[school_name] = school_color(sync_state, school_name)
+        
+        if school_name not in schools:
+            schools[school_name] = []
         
-        if school_name:
-            # Assign color if new school
-            if school_name not in school_color_map:
-                school_color_map[school_name] = SCHOOL_COLORS[color_index % len(SCHOOL_COLORS)]
-                color_index += 1
-            
-            if school_name not in schools:
-                schools[school_name] = []
-            
-            # Extract and rearrange columns: A, AW, AY, Q, R, S, O, Y, AV
-            new_row = [
-                row[col_A] if len(row) > col_A else '',      # A - Order Number
-                row[col_AW] if len(row) > col_AW else '',    # AW - Student Name
-                row[col_AY] if len(row) > col_AY else '',    # AY - Grade
-                row[col_Q] if len(row) > col_Q else '',      # Q - Quantity
-                row[col_R] if len(row) > col_R else '',      # R - Flavor
-                row[col_S] if len(row) > col_S else '',      # S - Price per item
-                row[col_O] if len(row) > col_O else '',      # O - Shipping Method
-                row[col_Y] if len(row) > col_Y else '',      # Y - Billing Name
-                row[col_AV] if len(row) > col_AV else '',    # AV - School
-            ]
-            
-            schools[school_name].append({
-                'row_index': idx + 2,  # +2 because: +1 for header, +1 for 1-based index
-                'data': new_row
-            })
+        # Line index into the parsed order lines
+        schools[school_name].append(idx)
 
 print(f"\nFound {len(schools)} schools:")
 for school, orders in schools.items():
     print(f"  {school}: {len(orders)} orders")
 
+# Only schools whose MASTER rows changed since their sheet was last checked
+# are read and updated (every school with --full)
+tracker = BuildTracker(spreadsheet.id)
+digests = school_digests(lines.school, lines.source_rows)
+stale = set(digests) if '--full' in sys.argv else set(tracker.stale(SCHOOL_SHEET, digests))
+
+print(f"{len(stale)} schools changed since the last run")
+
+# All sheet changes below are planned first and sent together at the end
+batch = SheetsBatch(spreadsheet)
+
 # Step 1: Highlight rows in MASTER sheet by school color
 print("\nHighlighting rows in MASTER sheet...")
 
-batch_updates = []
+row_colors = {}
 
 for school_name, school_data in schools.items():
     color = school_color_map[school_name]
     
-    for order in school_data:
-        row_idx = order['row_index']
-        
-        # Format entire row with school color
-        batch_updates.append({
-            'repeatCell': {
-                'range': {
-                    'sheetId': master_sheet.id,
-                    'startRowIndex': row_idx - 1,
-                    'endRowIndex': row_idx,
-                },
-                'cell': {
-                    'userEnteredFormat': {
-                        'backgroundColor': color
-                    }
-                },
-                'fields': 'userEnteredFormat.backgroundColor'
-            }
-        })
-
-# Apply all highlighting at once
-if batch_updates:
-    spreadsheet.batch_update({'requests': batch_updates})
-    print(f"✓ Highlighted {len(batch_updates)} rows")
+    for idx in school_data:
+        row_colors[lines.row_numbers[idx]] = color
+
+# Skip rows that already have the right color and merge the rest into ranges
+current_colors = fetch_row_colors(spreadsheet, 'MASTER', len(lines) + 1)
+highlight_updates, highlighted = highlight_requests(master_sheet.id, row_colors, current_colors)
+
+for request in highlight_updates:
+    batch.add_request(request)
+
+print(f"✓ Planned highlighting for {highlighted} rows ({len(highlight_updates)} ranges)")
 
 # Step 2: Create/update school sheets
 print("\nCreating/updating school sheets...")
 
 # Get new header order: A, AW, AY, Q, R, S, O, Y, AV
-new_headers = [
-    headers[col_A],
-    headers[col_AW],
-    headers[col_AY],
-    headers[col_Q],
-    headers[col_R],
-    headers[col_S],
-    headers[col_O],
-    headers[col_Y],
-    headers[col_AV]
-]
+new_headers = [lines.header(field) for field in SCHOOL_SHEET_FIELDS]
+
+# Read every changed school's sheet in one request
+existing_titles = [f"{school_name} MASTER" for school_name in schools if school_name in stale and batch.has_sheet(f"{school_name} MASTER")]
+existing_values = batch.read_values(existing_titles)
 
 for school_name, school_orders in schools.items():
     sheet_name = f"{school_name} MASTER"
     
-    print(f"  Processing {sheet_name}...")
+    if school_name not in stale and batch.has_sheet(sheet_name):
+        continue
     
-    # Check if sheet exists
-    try:
-        school_sheet = spreadsheet.worksheet(sheet_name)
-        existing_sheet = True
-        print(f"    ✓ Found existing sheet")
-    except:
-        # Create new sheet
-        school_sheet = spreadsheet.add_worksheet(title=sheet_name, rows=1000, cols=20)
-        existing_sheet = False
-        print(f"    ✓ Created new sheet")
+    print(f"  Processing {sheet_name}...")
     
-    if not existing_sheet:
-        # New sheet - add headers
-        school_sheet.update('A1:I1', [new_headers])
+    if sheet_name not in existing_values:
+        # New sheet - add headers and all data
+        data_to_add = [lines.school_sheet_row(idx) for idx in school_orders]
         
-        # Format header
-        school_sheet.format('A1:I1', {
-            'backgroundColor': {'red': 0.2, 'green': 0.2, 'blue': 0.2},
-            'textFormat': {'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}, 'bold': True}
-        })
+        batch.add_sheet(sheet_name, rows=max(1000, len(data_to_add) + 1), cols=20)
+        batch.write_rows(sheet_name, 1, [new_headers] + data_to_add)
         
-        # Add all data
-        data_to_add = [order['data'] for order in school_orders]
-        if data_to_add:
-            school_sheet.append_rows(data_to_add)
+        # Format header
+        batch.format(sheet_name, 'A1:I1', HEADER_FORMAT)
         
-        print(f"    ✓ Added {len(data_to_add)} orders")
+        print(f"    ✓ Creating new sheet with {len(data_to_add)} orders")
     
     else:
-                # Existing sheet - check which orders are new
-                existing_data = school_sheet.get_all_values()
-                existing_order_nums = set()
-                
-                if len(existing_data) > 1:
-                    # Get existing order numbers (column A)
-                    for row in existing_data[1:]:
-                        if row and row[0]:
-                            existing_order_nums.add(row[0])
-                
-                # Find new orders
-                new_orders = []
-                for order in school_orders:
-                    order_num = order['data'][0]
-                    if order_num not in existing_order_nums:
-                        new_orders.append(order['data'])
-                
-                if new_orders:
-                    # Sort new orders by order number (descending) and insert at top
-                    new_orders.sort(key=lambda x: int(x[0]) if x[0].isdigit() else 0, reverse=True)
-                    # Insert new rows starting at row 2 (after header)
-                    school_sheet.insert_rows(new_orders, row=2)
-                    print(f"    ✓ Added {len(new_orders)} new orders at the top")
-                else:
-                    print(f"    ✓ No new orders to add")
+        # Existing sheet - check which orders are new
+        existing_data = existing_values[sheet_name]
+        existing_order_nums = set()
+        
+        if len(existing_data) > 1:
+            # Get existing order numbers (column A)
+            for row in existing_data[1:]:
+                if row and row[0]:
+                    existing_order_nums.add(row[0])
+        
+        # Find new orders
+        new_orders = []
+        for idx in school_orders:
+            new_row = lines.school_sheet_row(idx)
+            if new_row[0] not in existing_order_nums:
+                new_orders.append(new_row)
+        
+        if new_orders:
+            # Sort new orders by order number (descending) and insert at top
+            new_orders.sort(key=order_sort_key, reverse=True)
+            # Insert new rows starting at row 2 (after header)
+            batch.insert_rows(sheet_name, new_orders, row=2)
+            print(f"    ✓ Adding {len(new_orders)} new orders at the top")
+        else:
+            print(f"    ✓ No new orders to add")
+
+# Send everything in a few requests
+calls = batch.execute()
+print(f"\n✓ Sent all updates in {calls} requests")
+
+# Remember how far MASTER has been synced for the next incremental run
+record_full_sync(sync_state, lines, schools)
+save_sync_state(spreadsheet.id, sync_state)
+
+# ...and which MASTER data each school sheet is up to date with
+for school_name in schools:
+    tracker.record(SCHOOL_SHEET, school_name, digests[school_name])
+tracker.forget_missing(SCHOOL_SHEET, digests)
+tracker.save()
 
 print(f"\n✅ COMPLETE!")
 print(f"Processed {len(schools)} schools")
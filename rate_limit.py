@@ -0,0 +1,47 @@
+from googleapiclient.errors import HttpError
+import threading
+import time
+
+# Per-user quotas (requests per minute), kept a little under the published limits
+SHEETS_REQUESTS_PER_MINUTE = 55
+DOCS_WRITES_PER_MINUTE = 55
+DOCS_READS_PER_MINUTE = 280
+DRIVE_REQUESTS_PER_MINUTE = 1000
+
+# Errors worth retrying: rate limited, or a temporary server problem
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: at most rate_per_minute calls, in bursts of up to burst"""
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst or max(1, int(self.rate * 5))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, waiting until one is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def should_retry(error):
+    """True for quota and temporary server errors (quota errors can also be a 403)"""
+    if error.resp.status in RETRY_STATUSES:
+        return True
+    content = error.content or b''
+    return error.resp.status == 403 and (b'rateLimitExceeded' in content or b'userRateLimitExceeded' in content)
+
@@ -0,0 +1,86 @@
+from gspread.utils import absolute_range_name
+
+
+def fetch_row_colors(spreadsheet, sheet_title, last_row):
+    """Current background color of each row (read from column A) in one request
+
+    Returns {row_number: color} for rows that have a background color.
+    Only the background color field is requested, not the cell values.
+    """
+    metadata = spreadsheet.fetch_sheet_metadata(params={
+        'ranges': absolute_range_name(sheet_title, f"A1:A{last_row}"),
+        'fields': 'sheets.data(startRow,rowData.values.userEnteredFormat.backgroundColor)'
+    })
+
+    colors = {}
+    for grid in metadata.get('sheets', [{}])[0].get('data', []):
+        first_row = grid.get('startRow', 0) + 1
+        for offset, row_data in enumerate(grid.get('rowData', [])):
+            values = row_data.get('values', [])
+            color = values[0].get('userEnteredFormat', {}).get('backgroundColor') if values else None
+            if color:
+                colors[first_row + offset] = color
+
+    return colors
+
+
+def same_color(color1, color2):
+    """Compare two API colors (channels left out by the API are 0)"""
+    if not color1 or not color2:
+        return False
+    return all(
+        round(color1.get(channel, 0), 3) == round(color2.get(channel, 0), 3)
+        for channel in ('red', 'green', 'blue')
+    )
+
+
+def highlight_requests(sheet_id, row_colors, current_colors=None):
+    """repeatCell requests that give each row its color
+
+    row_colors is {row_number: color}. Rows that already have their color
+    in current_colors are skipped, and adjacent rows with the same color
+    are merged into a single range. Returns (requests, rows_changed).
+    """
+    current_colors = current_colors or {}
+    requests = []
+    rows_changed = 0
+    run_start = run_end = run_color = None
+
+    def close_run():
+        if run_start is not None:
+            requests.append({
+                'repeatCell': {
+                    'range': {
+                        'sheetId': sheet_id,
+                        'startRowIndex': run_start - 1,
+                        'endRowIndex': run_end,
+                    },
+                    'cell': {
+                        'userEnteredFormat': {
+                            'backgroundColor': run_color
+                        }
+                    },
+                    'fields': 'userEnteredFormat.backgroundColor'
+                }
+            })
+
+    for row_number in sorted(row_colors):
+        color = row_colors[row_number]
+        extends_run = run_start is not None and row_number == run_end + 1 and run_color == color
+
+        # Rows that are already right only get recolored if that keeps a range whole
+        if same_color(current_colors.get(row_number), color):
+            if extends_run:
+                run_end = row_number
+            continue
+
+        rows_changed += 1
+        if extends_run:
+            run_end = row_number
+        else:
+            close_run()
+            run_start = run_end = row_number
+            run_color = color
+
+    close_run()
+    return requests, rows_changed
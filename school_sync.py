@@ -0,0 +1,275 @@
+from gspread.utils import rowcol_to_a1
+from order_lines import OrderLines, SCHOOL_SHEET_FIELDS, resolve_columns
+from master_snapshot import CACHE_DIR, replace_file
+from sheets_batch import SheetsBatch
+from row_highlights import highlight_requests
+import hashlib
+import json
+import os
+
+# Readable pastel colors for highlighting MASTER rows by school
+SCHOOL_COLORS = [
+    {'red': 1.0, 'green': 0.9, 'blue': 0.9},     # Light pink
+    {'red': 0.9, 'green': 1.0, 'blue': 0.9},     # Light green
+    {'red': 0.9, 'green': 0.9, 'blue': 1.0},     # Light blue
+    {'red': 1.0, 'green': 1.0, 'blue': 0.9},     # Light yellow
+    {'red': 1.0, 'green': 0.9, 'blue': 1.0},     # Light purple
+    {'red': 0.9, 'green': 1.0, 'blue': 1.0},     # Light cyan
+    {'red': 1.0, 'green': 0.95, 'blue': 0.9},    # Light peach
+    {'red': 0.95, 'green': 0.95, 'blue': 1.0},   # Light lavender
+    {'red': 0.9, 'green': 1.0, 'blue': 0.95},    # Light mint
+    {'red': 1.0, 'green': 0.9, 'blue': 0.95},    # Light coral
+]
+
+# Header row format for "{school} MASTER" sheets
+HEADER_FORMAT = {
+    'backgroundColor': {'red': 0.2, 'green': 0.2, 'blue': 0.2},
+    'textFormat': {'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}, 'bold': True}
+}
+
+
+def order_sort_key(row):
+    """Sort key for school sheet rows (order number, non-numeric last)"""
+    return int(row[0]) if row[0].isdigit() else 0
+
+
+def row_checksum(row):
+    """Checksum of a MASTER row, ignoring trailing empty cells"""
+    values = list(row)
+    while values and values[-1] == '':
+        values.pop()
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+
+def keys_checksum(order_numbers, schools, checksum=''):
+    """Chained checksum of each row's order number and school
+
+    Extending the checksum of rows 1..n with rows n+1..m gives the checksum
+    of rows 1..m, so after a sync it's updated from the new rows alone.
+    """
+    for order_number, school in zip(order_numbers, schools):
+        checksum = hashlib.sha1(f"{checksum}\x1f{order_number}\x1f{school}".encode('utf-8')).hexdigest()
+    return checksum
+
+
+def _state_path(spreadsheet_id):
+    return os.path.join(CACHE_DIR, f"school_sync_{spreadsheet_id}.json")
+
+
+def load_sync_state(spreadsheet_id):
+    """Load the per-school watermarks saved by the last sync"""
+    try:
+        with open(_state_path(spreadsheet_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'master_rows': 0, 'schools': {}, 'colors': {}}
+
+
+def save_sync_state(spreadsheet_id, state):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with replace_file(_state_path(spreadsheet_id)) as f:
+        json.dump(state, f, indent=2)
+
+
+def school_color(state, school_name):
+    """Highlight color for a school, kept the same from run to run"""
+    colors = state.setdefault('colors', {})
+    if school_name not in colors:
+        colors[school_name] = len(colors)
+    return SCHOOL_COLORS[colors[school_name] % len(SCHOOL_COLORS)]
+
+
+def _last_order(order_nums):
+    """Highest numeric order number, or None"""
+    order_nums = [order_num for order_num in order_nums if order_num and order_num.isdigit()]
+    return max(order_nums, key=int) if order_nums else None
+
+
+def record_full_sync(state, lines, schools):
+    """Set every school's watermark after a full sync of all MASTER rows"""
+    master_rows = len(lines)
+    checksum = row_checksum(lines.source_rows[-1]) if master_rows else ''
+    state['master_rows'] = master_rows
+    state['schools'] = {}
+
+    # Order number and school of every synced row, to catch edits above the watermark
+    state['keys'] = {
+        'columns': [lines.columns['order_number'], lines.columns['school']],
+        'rows': master_rows,
+        'checksum': keys_checksum(lines.order_number, lines.school)
+    }
+
+    for school_name, line_indices in schools.items():
+        state['schools'][school_name] = {
+            'master_rows': master_rows,
+            'checksum': checksum,
+            'last_order': _last_order(lines.order_number[idx] for idx in line_indices)
+        }
+
+
+def read_new_master_rows(master_sheet, state):
+    """Read the header and the MASTER rows after the oldest school watermark
+
+    Returns (headers, start, values) where values[0] is data row start
+    (the header when start is 0) and the rest are the rows after it, or
+    None if there is no usable watermark (rows above it were edited,
+    inserted or deleted), in which case a full sync is needed.
+
+    With state['keys'] (see record_full_sync) the order number and school
+    columns above the watermark are read in the same request and checked
+    too, so a moved or re-assigned order is caught, not just a change to
+    the watermark row itself. That check reads and hashes those two
+    columns for every synced row, so its cost grows with the sheet (it's
+    still 2 of MASTER's ~50 columns, in the same request).
+    """
+    watermarks = list(state.get('schools', {}).values())
+    if not watermarks:
+        return None
+
+    start = min([state.get('master_rows', 0)] + [mark['master_rows'] for mark in watermarks])
+    end_cell = rowcol_to_a1(max(master_sheet.row_count, start + 1), master_sheet.col_count)
+
+    # One request: header row, everything from the oldest watermark row down
+    # and the two key columns above it
+    keys = state.get('keys')
+    ranges = ['1:1', f"A{start + 1}:{end_cell}"]
+    if keys and keys['rows']:
+        ranges += [f"{rowcol_to_a1(2, col + 1)}:{rowcol_to_a1(keys['rows'] + 1, col + 1)}" for col in keys['columns']]
+    header_range, values, *key_ranges = master_sheet.batch_get(ranges)
+    headers = header_range[0] if header_range else []
+    values = list(values)
+
+    if start and not values:
+        return None
+
+    # Every watermark row must still hold the same data
+    for mark in watermarks:
+        offset = mark['master_rows'] - start
+        if mark['master_rows'] and (offset >= len(values) or row_checksum(values[offset]) != mark['checksum']):
+            return None
+
+    if key_ranges:
+        columns = resolve_columns(headers)
+        if [columns['order_number'], columns['school']] != keys['columns']:
+            return None
+
+        # Empty cells (and trailing empty rows) aren't returned
+        order_numbers, schools = (
+            [row[0].strip() if row else '' for row in column] + [''] * (keys['rows'] - len(column))
+            for column in key_ranges
+        )
+        if keys_checksum(order_numbers, schools) != keys['checksum']:
+            return None
+
+        # Second check: each school's newest order is still the one recorded
+        last_orders = {}
+        for order_number, school_name in zip(order_numbers, schools):
+            if order_number.isdigit() and (school_name not in last_orders or int(order_number) > int(last_orders[school_name])):
+                last_orders[school_name] = order_number
+        for school_name, mark in state['schools'].items():
+            if mark['master_rows'] == keys['rows'] and mark.get('last_order') != last_orders.get(school_name):
+                return None
+
+    return headers, start, values
+
+
+def sync_new_orders(spreadsheet, master_sheet, state, log):
+    """Push MASTER rows added since the last sync to the school sheets
+
+    Returns False if the watermarks can't be used and a full sync is needed.
+    """
+    delta = read_new_master_rows(master_sheet, state)
+    if delta is None:
+        return False
+
+    headers, start, values = delta
+    rows = values[1:]
+    lines = OrderLines(headers, rows, first_row=start + 2)
+    master_rows = start + len(rows)
+    checksum = row_checksum(values[-1]) if master_rows else ''
+    log(f"Read {len(rows)} rows added since the last sync")
+
+    # Sheet changes are planned here and sent together below
+    batch = SheetsBatch(spreadsheet)
+
+    # New lines per school, skipping rows each school has already synced
+    new_lines = {}
+    for idx, school_name in enumerate(lines.school):
+        if not school_name:
+            continue
+
+        mark = state['schools'].get(school_name)
+        synced_rows = mark['master_rows'] if mark else state['master_rows']
+        if start + idx + 1 <= synced_rows:
+            continue
+
+        # A known school whose sheet was deleted needs all of its rows again
+        if mark and not batch.has_sheet(f"{school_name} MASTER"):
+            log(f"'{school_name} MASTER' sheet is missing - running a full sync")
+            return False
+
+        new_lines.setdefault(school_name, []).append(idx)
+
+    if not new_lines:
+        log("No new orders since the last sync")
+
+    # Highlight only the new rows (appended rows are mostly contiguous ranges)
+    row_colors = {}
+    for school_name, line_indices in new_lines.items():
+        color = school_color(state, school_name)
+        for idx in line_indices:
+            row_colors[lines.row_numbers[idx]] = color
+
+    highlight_updates, _ = highlight_requests(master_sheet.id, row_colors)
+    for request in highlight_updates:
+        batch.add_request(request)
+
+    new_headers = [lines.header(field) for field in SCHOOL_SHEET_FIELDS]
+
+    for school_name, line_indices in new_lines.items():
+        sheet_name = f"{school_name} MASTER"
+        new_orders = [lines.school_sheet_row(idx) for idx in line_indices]
+        new_orders.sort(key=order_sort_key, reverse=True)
+
+        if batch.has_sheet(sheet_name):
+            # Newest orders go at the top, under the header
+            batch.insert_rows(sheet_name, new_orders, row=2)
+            log(f"Adding {len(new_orders)} new orders to {sheet_name}")
+        else:
+            batch.add_sheet(sheet_name, rows=max(1000, len(new_orders) + 1), cols=20)
+            batch.write_rows(sheet_name, 1, [new_headers] + new_orders)
+            batch.format(sheet_name, 'A1:I1', HEADER_FORMAT)
+            log(f"Creating {sheet_name} with {len(new_orders)} orders")
+
+        previous_last = state['schools'].get(school_name, {}).get('last_order')
+        state['schools'][school_name] = {
+            'master_rows': master_rows,
+            'checksum': checksum,
+            'last_order': _last_order([lines.order_number[idx] for idx in line_indices] + [previous_last])
+        }
+
+    if new_lines:
+        calls = batch.execute()
+        log(f"Sent all updates in {calls} requests")
+
+    # Schools without new rows are now synced up to the same row
+    for school_name, mark in state['schools'].items():
+        if school_name not in new_lines:
+            mark['master_rows'] = master_rows
+            mark['checksum'] = checksum
+
+    # Extend the key checksum with the rows read (it can't skip rows)
+    keys = state.get('keys')
+    if keys and start <= keys['rows'] <= master_rows:
+        offset = keys['rows'] - start
+        keys['checksum'] = keys_checksum(lines.order_number[offset:], lines.school[offset:], keys['checksum'])
+        keys['rows'] = master_rows
+    else:
+        state.pop('keys', None)
+
+    state['master_rows'] = master_rows
+    save_sync_state(spreadsheet.id, state)
+
+    if new_lines:
+        log(f"Synced {sum(len(indices) for indices in new_lines.values())} new rows for {len(new_lines)} schools")
+    return True
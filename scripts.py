@@ -13,8 +13,30 @@ from reportlab.lib.units import inch
 from datetime import datetime
 import streamlit as st
 import os
+from master_snapshot import load_master_snapshot, CACHE_DIR
+from api_client import set_entry_point
+import client_pool
+from order_lines import get_order_lines, SCHOOL_SHEET_FIELDS
+from aggregation import production_totals
+from sheets_batch import SheetsBatch
+from row_highlights import fetch_row_colors, highlight_requests
+from order_forms import is_pickup_row, group_orders, render_order_pdfs, write_order_forms_pdf, write_packets
+from docx_template import load_compiled_template
+from drive_cache import DriveIds
+from build_tracker import BuildTracker, SCHOOL_SHEET, PRODUCTION_REPORT, ORDER_FORMS, school_digests, rows_digest
+from school_sync import (
+    load_sync_state, save_sync_state, sync_new_orders, record_full_sync,
+    school_color, order_sort_key, HEADER_FORMAT
+)
+
+# Latest order form packet of each school, reused while its sheet is unchanged
+PACKETS_DIR = os.path.join(CACHE_DIR, 'packets')
 
 def get_credentials():
+    """Google API credentials, loaded once per process and refreshed in the background"""
+    return client_pool.credentials(load_credentials)
+
+def load_credentials():
     """Get Google API credentials from service account"""
     SCOPES = [
         'https://www.googleapis.com/auth/spreadsheets',
@@ -53,145 +75,97 @@ def get_credentials():
         else:
             raise Exception(f"No credentials found. Error: {str(e)}")
 
-def organize_schools():
+def organize_schools(full_refresh=False, output=None):
     """Organize school data and color-code master sheet"""
-    output = []
+    # Progress lines go to output (a list, or a background job's live log)
+    output = [] if output is None else output
     
     try:
+        set_entry_point('organize_schools')
         creds = get_credentials()
-        gc = gspread.authorize(creds)
+        gc = client_pool.gspread_client(creds)
         
-        spreadsheet = gc.open('MASTER SPRING 2026')
+        spreadsheet = client_pool.open_spreadsheet(gc, 'MASTER SPRING 2026')
+        # School sheets may be added below
+        client_pool.forget_worksheet_titles(spreadsheet)
         master_sheet = spreadsheet.worksheet('MASTER')
+        sync_state = load_sync_state(spreadsheet.id)
         
-        output.append("Reading MASTER sheet...")
+        # Only push rows added since the last run while the saved watermarks are valid
+        if not full_refresh and sync_new_orders(spreadsheet, master_sheet, sync_state, output.append):
+            output.append("\nCOMPLETE! School sheets are up to date")
+            return "\n".join(output), None
         
-        data = master_sheet.get_all_values()
-        rows = data[1:]
-        headers = data[0]
+        snapshot = load_master_snapshot(spreadsheet, creds, output.append)
+        rows = snapshot.rows
         
         output.append(f"Found {len(rows)} rows")
         
-        # Column indices
-        col_A = 0
-        col_O = 14
-        col_Q = 16
-        col_R = 17
-        col_S = 18
-        col_Y = 24
-        col_AV = 47
-        col_AW = 48
-        col_AY = 50
-        
-        # School colors
-        SCHOOL_COLORS = [
-            {'red': 1.0, 'green': 0.9, 'blue': 0.9},
-            {'red': 0.9, 'green': 1.0, 'blue': 0.9},
-            {'red': 0.9, 'green': 0.9, 'blue': 1.0},
-            {'red': 1.0, 'green': 1.0, 'blue': 0.9},
-            {'red': 1.0, 'green': 0.9, 'blue': 1.0},
-            {'red': 0.9, 'green': 1.0, 'blue': 1.0},
-            {'red': 1.0, 'green': 0.95, 'blue': 0.9},
-            {'red': 0.95, 'green': 0.95, 'blue': 1.0},
-            {'red': 0.9, 'green': 1.0, 'blue': 0.95},
-            {'red': 1.0, 'green': 0.9, 'blue': 0.95},
-        ]
+        lines = get_order_lines(snapshot)
         
         # Group by school
         schools = {}
         school_color_map = {}
-        color_index = 0
         
-        for idx, row in enumerate(rows):
-            if len(row) > col_AV:
-                school_name = row[col_AV].strip()
+        for idx, school_name in enumerate(lines.school):
+            if school_name:
+                if school_name not in school_color_map:
+                    school_color_map[school_name] = school_color(sync_state, school_name)
+                
+                if school_name not in schools:
+                    schools[school_name] = []
                 
-                if school_name:
-                    if school_name not in school_color_map:
-                        school_color_map[school_name] = SCHOOL_COLORS[color_index % len(SCHOOL_COLORS)]
-                        color_index += 1
-                    
-                    if school_name not in schools:
-                        schools[school_name] = []
-                    
-                    new_row = [
-                        row[col_A] if len(row) > col_A else '',
-                        row[col_AW] if len(row) > col_AW else '',
-                        row[col_AY] if len(row) > col_AY else '',
-                        row[col_Q] if len(row) > col_Q else '',
-                        row[col_R] if len(row) > col_R else '',
-                        row[col_S] if len(row) > col_S else '',
-                        row[col_O] if len(row) > col_O else '',
-                        row[col_Y] if len(row) > col_Y else '',
-                        row[col_AV] if len(row) > col_AV else '',
-                    ]
-                    
-                    schools[school_name].append({
-                        'row_index': idx + 2,
-                        'data': new_row
-                    })
+                schools[school_name].append(idx)
         
         output.append(f"\nFound {len(schools)} schools")
         
-        # Highlight rows
-        batch_updates = []
+        # School sheets are only rebuilt for schools whose MASTER rows changed
+        # since the last rebuild (all of them on a full refresh)
+        tracker = BuildTracker(spreadsheet.id)
+        digests = school_digests(lines.school, lines.source_rows)
+        stale = set(digests) if full_refresh else set(tracker.stale(SCHOOL_SHEET, digests))
+        
+        # All sheet changes below are planned first and sent together
+        batch = SheetsBatch(spreadsheet)
+        
+        # Highlight rows - only rows whose color changes, merged into ranges
+        row_colors = {}
         for school_name, school_data in schools.items():
-            color = school_color_map[school_name]
-            for order in school_data:
-                row_idx = order['row_index']
-                batch_updates.append({
-                    'repeatCell': {
-                        'range': {
-                            'sheetId': master_sheet.id,
-                            'startRowIndex': row_idx - 1,
-                            'endRowIndex': row_idx,
-                        },
-                        'cell': {
-                            'userEnteredFormat': {
-                                'backgroundColor': color
-                            }
-                        },
-                        'fields': 'userEnteredFormat.backgroundColor'
-                    }
-                })
-        
-        if batch_updates:
-            spreadsheet.batch_update({'requests': batch_updates})
-            output.append(f"Highlighted {len(batch_updates)} rows")
+            for idx in school_data:
+                row_colors[lines.row_numbers[idx]] = school_color_map[school_name]
+        
+        current_colors = fetch_row_colors(spreadsheet, 'MASTER', len(lines) + 1)
+        highlight_updates, highlighted = highlight_requests(master_sheet.id, row_colors, current_colors)
+        for request in highlight_updates:
+            batch.add_request(request)
         
         # Create/update school sheets
-        new_headers = [
-            headers[col_A], headers[col_AW], headers[col_AY],
-            headers[col_Q], headers[col_R], headers[col_S],
-            headers[col_O], headers[col_Y], headers[col_AV]
-        ]
+        new_headers = [lines.header(field) for field in SCHOOL_SHEET_FIELDS]
+        
+        # Existing school sheets that need rebuilding are read in a single request
+        existing_titles = [f"{school_name} MASTER" for school_name in schools if school_name in stale and batch.has_sheet(f"{school_name} MASTER")]
+        existing_values = batch.read_values(existing_titles)
+        unchanged = 0
         
         for school_name, school_orders in schools.items():
             sheet_name = f"{school_name} MASTER"
             
-            try:
-                school_sheet = spreadsheet.worksheet(sheet_name)
-                existing_sheet = True
-            except:
-                school_sheet = spreadsheet.add_worksheet(title=sheet_name, rows=1000, cols=20)
-                existing_sheet = False
+            if school_name not in stale and batch.has_sheet(sheet_name):
+                unchanged += 1
+                continue
             
-            if not existing_sheet:
-                school_sheet.update(values=[new_headers], range_name='A1:I1')
-                school_sheet.format('A1:I1', {
-                    'backgroundColor': {'red': 0.2, 'green': 0.2, 'blue': 0.2},
-                    'textFormat': {'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}, 'bold': True}
-                })
+            if sheet_name not in existing_values:
+                data_to_add = [lines.school_sheet_row(idx) for idx in school_orders]
+                data_to_add.sort(key=order_sort_key, reverse=True)
                 
-                data_to_add = [order['data'] for order in school_orders]
-                data_to_add.sort(key=lambda x: int(x[0]) if x[0].isdigit() else 0, reverse=True)
-                if data_to_add:
-                    school_sheet.append_rows(data_to_add)
+                batch.add_sheet(sheet_name, rows=max(1000, len(data_to_add) + 1), cols=20)
+                batch.write_rows(sheet_name, 1, [new_headers] + data_to_add)
+                batch.format(sheet_name, 'A1:I1', HEADER_FORMAT)
                 
                 output.append(f"Created {sheet_name} with {len(data_to_add)} orders")
             else:
                 # Existing sheet - get all existing data and re-sort everything
-                existing_data = school_sheet.get_all_values()
+                existing_data = existing_values[sheet_name]
                 existing_order_nums = set()
                 
                 # Skip header, get all existing orders
@@ -204,30 +178,39 @@ def organize_schools():
                 
                 # Find new orders
                 new_orders = []
-                for order in school_orders:
-                    order_num = order['data'][0]
-                    if order_num not in existing_order_nums:
-                        new_orders.append(order['data'])
+                for idx in school_orders:
+                    new_row = lines.school_sheet_row(idx)
+                    if new_row[0] not in existing_order_nums:
+                        new_orders.append(new_row)
                 
                 if new_orders:
                     output.append(f"Added {len(new_orders)} new orders to {sheet_name}")
                 
                 # Combine all orders (existing + new) and sort by order number descending
                 all_orders = all_existing_orders + new_orders
-                all_orders.sort(key=lambda x: int(x[0]) if x[0].isdigit() else 0, reverse=True)
+                all_orders.sort(key=order_sort_key, reverse=True)
                 
                 # Clear sheet and rewrite with sorted data
-                school_sheet.clear()
-                school_sheet.update(values=[new_headers], range_name='A1:I1')
-                school_sheet.format('A1:I1', {
-                    'backgroundColor': {'red': 0.2, 'green': 0.2, 'blue': 0.2},
-                    'textFormat': {'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}, 'bold': True}
-                })
-                if all_orders:
-                    school_sheet.append_rows(all_orders)
+                batch.clear(sheet_name)
+                batch.write_rows(sheet_name, 1, [new_headers] + all_orders)
+                batch.format(sheet_name, 'A1:I1', HEADER_FORMAT)
                 
                 output.append(f"Sheet re-sorted with {len(all_orders)} total orders")
         
+        calls = batch.execute()
+        output.append(f"Highlighted {highlighted} rows ({len(highlight_updates)} ranges)")
+        output.append(f"Sent all sheet updates in {calls} requests")
+        output.append(f"{unchanged} school sheets unchanged since the last rebuild")
+        
+        for school_name in schools:
+            tracker.record(SCHOOL_SHEET, school_name, digests[school_name])
+        tracker.forget_missing(SCHOOL_SHEET, digests)
+        tracker.save()
+        
+        # Remember how far MASTER has been synced for the next incremental run
+        record_full_sync(sync_state, lines, schools)
+        save_sync_state(spreadsheet.id, sync_state)
+        
         output.append(f"\nCOMPLETE! Processed {len(schools)} schools")
         
         return "\n".join(output), None
@@ -235,69 +218,40 @@ def organize_schools():
     except Exception as e:
         return "\n".join(output), str(e)
 
-def create_production_report():
+def create_production_report(output=None):
     """Create production report"""
-    output = []
+    output = [] if output is None else output
     
     try:
+        set_entry_point('create_production_report')
         creds = get_credentials()
-        gc = gspread.authorize(creds)
+        gc = client_pool.gspread_client(creds)
         
-        spreadsheet = gc.open('MASTER SPRING 2026')
-        master_sheet = spreadsheet.worksheet('MASTER')
+        spreadsheet = client_pool.open_spreadsheet(gc, 'MASTER SPRING 2026')
         
-        output.append("Reading MASTER sheet...")
-        
-        data = master_sheet.get_all_values()
-        rows = data[1:]
+        snapshot = load_master_snapshot(spreadsheet, creds, output.append)
+        rows = snapshot.rows
         
         output.append(f"Found {len(rows)} rows")
         
-        # Column indices
-        col_quantity = 16
-        col_flavor = 17
-        col_delivery = 14
-        col_price = 18
-        col_school = 47
-        
-        # Collect data
-        schools_data = {}
-        all_flavors_data = {}
-        
-        for row in rows:
-            if len(row) > col_school:
-                school = row[col_school].strip()
-                flavor = row[col_flavor].strip()
-                delivery = row[col_delivery].strip()
-                
-                try:
-                    quantity = int(row[col_quantity]) if row[col_quantity].isdigit() else 0
-                except:
-                    quantity = 0
-                
-                if not school or not flavor or quantity == 0:
-                    continue
-                
-                delivery_type = 'pickup' if 'pick' in delivery.lower() else 'shipping'
-                
-                if school not in schools_data:
-                    schools_data[school] = {}
-                
-                if flavor not in schools_data[school]:
-                    schools_data[school][flavor] = {'pickup': 0, 'shipping': 0}
-                
-                schools_data[school][flavor][delivery_type] += quantity
-                
-                if flavor not in all_flavors_data:
-                    all_flavors_data[flavor] = {'pickup': 0, 'shipping': 0}
-                
-                all_flavors_data[flavor][delivery_type] += quantity
+        # The report covers every school, so it's only rebuilt when some school's rows changed
+        lines = get_order_lines(snapshot)
+        tracker = BuildTracker(spreadsheet.id)
+        digests = school_digests(lines.school, lines.source_rows)
+        previous_report = tracker.shared_file(PRODUCTION_REPORT, digests)
+        
+        if previous_report:
+            output.append(f"\nNo orders changed since the last report: {previous_report}")
+            return "\n".join(output), None, previous_report
+        
+        # Totals per school/flavor/delivery type, computed in one vectorized pass
+        schools_data, all_flavors_data, grand_totals = production_totals(snapshot)
         
         output.append(f"Found {len(schools_data)} schools")
         output.append(f"Found {len(all_flavors_data)} flavors")
         
-        grand_pickup_total = sum(f['pickup'] for f in all_flavors_data.values())
-        grand_shipping_total = sum(f['shipping'] for f in all_flavors_data.values())
+        grand_pickup_total = grand_totals['pickup']
+        grand_shipping_total = grand_totals['shipping']
         
         # Create PDF
         pdf_filename = f"Production_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
@@ -398,6 +352,11 @@ def create_production_report():
         
         doc.build(story)
         
+        for school_name, digest in digests.items():
+            tracker.record(PRODUCTION_REPORT, school_name, digest, pdf_filename)
+        tracker.forget_missing(PRODUCTION_REPORT, digests)
+        tracker.save()
+        
         output.append(f"\nPDF created: {pdf_filename}")
         output.append(f"Grand total: {grand_pickup_total + grand_shipping_total} bags")
         output.append(f"  Pick-up: {grand_pickup_total}")
@@ -408,49 +367,42 @@ def create_production_report():
     except Exception as e:
         return "\n".join(output), str(e), None
 
-def export_order_forms(school_name):
-    """Generate order forms for a specific school using docx template"""
-    output = []
+def load_order_template(creds, output):
+    """Compiled 'Order Template for PDF' Word template, or None if it's missing"""
+    with client_pool.service(creds, 'drive', 'v3') as drive_service:
+        # Find template (id remembered between runs)
+        template_file = DriveIds(drive_service).template('Order Template for PDF')
+        
+        if not template_file:
+            return None
+        
+        output.append("Found template")
+        
+        # Parsed once per template revision, then reused from the local cache
+        return load_compiled_template(drive_service, template_file['id'], template_file.get('modifiedTime'), output.append)
+
+def export_order_forms(school_name, use_template=False, output=None):
+    """Generate order forms for a specific school (ReportLab, or the docx template)"""
+    output = [] if output is None else output
     
     try:
-        from docx import Document
-        from docx.shared import Pt, RGBColor
-        from docx2pdf import convert
         import tempfile
         
+        set_entry_point('export_order_forms')
         creds = get_credentials()
-        gc = gspread.authorize(creds)
-        drive_service = build('drive', 'v3', credentials=creds)
-        
-        # Find template
-        template_query = "name='Order Template for PDF' and mimeType='application/vnd.google-apps.document'"
-        template_results = drive_service.files().list(q=template_query).execute()
-        templates = template_results.get('files', [])
-        
-        if not templates:
-            return "\n".join(output), "Template 'Order Template for PDF' not found!", None
+        gc = client_pool.gspread_client(creds)
         
-        TEMPLATE_ID = templates[0]['id']
-        output.append("Found template")
-        
-        # Download template as Word document
-        output.append("Downloading template...")
-        request = drive_service.files().export_media(
-            fileId=TEMPLATE_ID,
-            mimeType='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        )
-        
-        template_docx = 'template.docx'
-        with io.FileIO(template_docx, 'wb') as fh:
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
+        # Forms are laid out with ReportLab unless the Word template is requested
+        template = None
         
-        output.append("Template downloaded")
+        if use_template:
+            template = load_order_template(creds, output)
+            
+            if template is None:
+                return "\n".join(output), "Template 'Order Template for PDF' not found!", None
         
         # Read from school-specific sheet
-        spreadsheet = gc.open('MASTER SPRING 2026')
+        spreadsheet = client_pool.open_spreadsheet(gc, 'MASTER SPRING 2026')
         
         try:
             school_sheet = spreadsheet.worksheet(f"{school_name} MASTER")
@@ -462,161 +414,48 @@ def export_order_forms(school_name):
         
         output.append(f"Found {len(rows)} rows in {school_name} MASTER")
         
-        # Column indices
-        col_order_num = 0
-        col_student = 1
-        col_grade = 2
-        col_quantity = 3
-        col_flavor = 4
-        col_price = 5
-        col_delivery = 6
-        col_billing = 7
-        col_school = 8
-        
         # Filter for pick-up orders
-        pickup_orders = []
-        for row in rows:
-            if len(row) > col_delivery and row[col_delivery] == 'Pick-up at school':
-                pickup_orders.append(row)
+        pickup_orders = [row for row in rows if is_pickup_row(row)]
         
         output.append(f"Found {len(pickup_orders)} pick-up orders")
         
-        # Group orders
-        orders = {}
+        # Group orders, sorted by grade then student name
+        sorted_orders = group_orders(pickup_orders)
         
-        for row in pickup_orders:
-            order_num = row[col_order_num]
-            quantity = int(row[col_quantity]) if row[col_quantity].isdigit() else 0
-            flavor = row[col_flavor]
-            
-            student_name = row[col_student] if len(row) > col_student else ''
-            student_grade = row[col_grade] if len(row) > col_grade else ''
-            billing_name = row[col_billing] if len(row) > col_billing else ''
-            school = row[col_school] if len(row) > col_school else ''
-            
-            if order_num not in orders:
-                orders[order_num] = {
-                    'order_number': order_num,
-                    'billing_name': billing_name,
-                    'school': school,
-                    'student_name': student_name,
-                    'student_grade': student_grade,
-                    'items': []
-                }
-            
-            orders[order_num]['items'].append({'flavor': flavor, 'quantity': quantity})
+        output.append(f"Grouped into {len(sorted_orders)} unique orders")
         
-        output.append(f"Grouped into {len(orders)} unique orders")
-        
-        if len(orders) == 0:
+        if len(sorted_orders) == 0:
             return "\n".join(output), "No pick-up orders found for this school", None
         
-        # Sort orders
-        def grade_sort_key(grade):
-            grade_upper = grade.upper().strip()
-            if grade_upper == 'K' or grade_upper.startswith('KINDER'):
-                return (0, '')
-            if grade_upper.isdigit():
-                return (int(grade_upper), '')
-            if grade_upper and grade_upper[0].isdigit():
-                return (int(grade_upper[0]), grade_upper)
-            return (999, grade_upper)
-        
-        sorted_orders = sorted(
-            orders.items(),
-            key=lambda x: (grade_sort_key(x[1]['student_grade']), x[1]['student_name'])
-        )
+        combined_pdf_filename = f"{school_name.replace(' ', '_')}_Orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         
-        # Limit to prevent timeout
-        max_orders = min(len(sorted_orders), 50)
-        if len(sorted_orders) > 50:
-            output.append(f"WARNING: Processing only first 50 of {len(sorted_orders)} orders")
-            sorted_orders = sorted_orders[:50]
+        if template is None:
+            # Every order goes straight into the one combined PDF
+            write_order_forms_pdf(sorted_orders, combined_pdf_filename)
+            output.append(f"Created {len(sorted_orders)} order forms")
+            output.append(f"Combined PDF created: {combined_pdf_filename}")
+            return "\n".join(output), None, combined_pdf_filename
         
-        # Create individual PDFs
+        # Convert each order through Word (one at a time, see render_order_pdfs);
+        # results come back in sorted order and go straight to the merger
+        work_dir = tempfile.mkdtemp(prefix='order_forms_')
         pdf_files = []
+        merger = PdfMerger()
         
-        for order_idx, (order_num, order) in enumerate(sorted_orders):
-            output.append(f"Creating PDF {order_idx + 1}/{len(sorted_orders)}...")
-            
-            # Load template
-            doc = Document(template_docx)
-            
-            # Replace placeholders in paragraphs
-            replacements = {
-                '{{Order Number}}': order['order_number'],
-                '{{Billing Name}}': order['billing_name'],
-                '{{Student name}}': order['student_name'],
-                '{{student name}}': order['student_name'],
-                '{{Grade}}': order['student_grade'],
-                '{{School}}': order['school']
-            }
-            
-            # Replace in all paragraphs
-            for paragraph in doc.paragraphs:
-                for key, value in replacements.items():
-                    if key in paragraph.text:
-                        paragraph.text = paragraph.text.replace(key, value)
-            
-            # Replace in tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        for key, value in replacements.items():
-                            if key in cell.text:
-                                cell.text = cell.text.replace(key, value)
-            
-            # Fill item quantities and flavors in table
-            for i in range(1, 14):
-                item_index = i - 1
-                
-                if item_index < len(order['items']):
-                    item = order['items'][item_index]
-                    qty_value = str(item['quantity'])
-                    flavor_value = item['flavor']
-                else:
-                    qty_value = ''
-                    flavor_value = ''
-                
-                # Replace in all tables
-                for table in doc.tables:
-                    for row in table.rows:
-                        for cell in row.cells:
-                            cell.text = cell.text.replace(f'{{{{quantity{i}}}}}', qty_value)
-                            cell.text = cell.text.replace(f'{{{{flavor name{i}}}}}', flavor_value)
-            
-            # Save as docx
-            temp_docx = f"temp_order_{order_idx}.docx"
-            doc.save(temp_docx)
-            
-            # Convert to PDF
-            temp_pdf = f"temp_order_{order_idx}.pdf"
-            try:
-                convert(temp_docx, temp_pdf)
-                pdf_files.append(temp_pdf)
-            except:
-                # If docx2pdf fails (common on Linux), use reportlab instead
-                output.append(f"  Note: Using alternative PDF generation for order {order_idx + 1}")
-                # For now, skip if conversion fails
-                pass
-            
-            # Clean up temp docx
-            try:
-                os.remove(temp_docx)
-            except:
-                pass
+        for order_idx, pdf_file, error in render_order_pdfs(sorted_orders, template, work_dir):
+            if pdf_file:
+                output.append(f"Created PDF {order_idx + 1}/{len(sorted_orders)}")
+                merger.append(pdf_file)
+                pdf_files.append(pdf_file)
+            else:
+                output.append(f"  Could not create PDF for order {order_idx + 1}: {error}")
         
         output.append(f"Created {len(pdf_files)} PDFs")
         
         if len(pdf_files) == 0:
+            merger.close()
             return "\n".join(output), "No PDFs were generated successfully", None
         
-        # Combine PDFs
-        merger = PdfMerger()
-        for pdf_file in pdf_files:
-            merger.append(pdf_file)
-        
-        combined_pdf_filename = f"{school_name.replace(' ', '_')}_Orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         merger.write(combined_pdf_filename)
         merger.close()
         
@@ -628,7 +467,7 @@ def export_order_forms(school_name):
                 pass
         
         try:
-            os.remove(template_docx)
+            os.rmdir(work_dir)
         except:
             pass
         
@@ -639,3 +478,145 @@ def export_order_forms(school_name):
     except Exception as e:
         import traceback
         return "\n".join(output), f"{str(e)}\n{traceback.format_exc()}", None
+
+def export_all_order_forms(school_names=None, use_template=False, output=None):
+    """Generate order forms for many schools at once (all schools by default)
+
+    The template and every school sheet are read once, each school's PDF is
+    built in parallel, and the PDFs are zipped with a manifest.json. Each
+    school's latest packet is kept in PACKETS_DIR and reused while its
+    sheet is unchanged.
+    """
+    output = [] if output is None else output
+    
+    try:
+        import hashlib
+        import json
+        import tempfile
+        import zipfile
+        from gspread.utils import absolute_range_name
+        
+        set_entry_point('export_all_order_forms')
+        creds = get_credentials()
+        gc = client_pool.gspread_client(creds)
+        spreadsheet = client_pool.open_spreadsheet(gc, 'MASTER SPRING 2026')
+        
+        all_schools = [title[:-len(' MASTER')] for title in client_pool.worksheet_titles(spreadsheet) if title.endswith(' MASTER') and title != 'MASTER']
+        
+        if school_names is None:
+            school_names = all_schools
+        
+        for school_name in school_names:
+            if school_name not in all_schools:
+                output.append(f"Sheet '{school_name} MASTER' not found - skipping")
+        school_names = [school_name for school_name in school_names if school_name in all_schools]
+        
+        if not school_names:
+            return "\n".join(output), "No school sheets found!", None
+        
+        template = None
+        
+        if use_template:
+            template = load_order_template(creds, output)
+            
+            if template is None:
+                return "\n".join(output), "Template 'Order Template for PDF' not found!", None
+        
+        # Every school sheet in one request
+        response = spreadsheet.values_batch_get([absolute_range_name(f"{school_name} MASTER", 'A:I') for school_name in school_names])
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        
+        # One packet file per school, replaced when rebuilt; each run only adds its zip
+        os.makedirs(PACKETS_DIR, exist_ok=True)
+        
+        manifest = {'generated': datetime.now().isoformat(timespec='seconds'), 'schools': {}}
+        packets = []
+        packet_paths = {}
+        
+        def packet_file_name(school_name):
+            # Name of a school's packet inside this run's zip
+            return f"{school_name.replace(' ', '_')}_Orders_{timestamp}.pdf"
+        
+        # A school's packet from an earlier run is reused if its sheet (and the layout) hasn't changed
+        tracker = BuildTracker(spreadsheet.id)
+        layout = hashlib.sha1(template.docx_bytes).hexdigest() if template else 'reportlab'
+        digests = {}
+        
+        for school_name, value_range in zip(school_names, response.get('valueRanges', [])):
+            rows = value_range.get('values', [])[1:]
+            pickup_orders = [row for row in rows if is_pickup_row(row)]
+            sorted_orders = group_orders(pickup_orders)
+            
+            manifest['schools'][school_name] = {
+                'rows': len(rows),
+                'pickup_rows': len(pickup_orders),
+                'orders': len(sorted_orders),
+                'file': None,
+                'error': None,
+                'reused': False
+            }
+            
+            if not sorted_orders:
+                manifest['schools'][school_name]['error'] = "No pick-up orders found for this school"
+                output.append(f"{school_name}: no pick-up orders")
+                continue
+            
+            packet_path = os.path.join(PACKETS_DIR, f"{school_name.replace(' ', '_').replace('/', '_')}.pdf")
+            packet_paths[school_name] = packet_path
+            digests[school_name] = rows_digest(rows, salt=layout)
+            
+            if tracker.file(ORDER_FORMS, school_name) == packet_path and tracker.is_fresh(ORDER_FORMS, school_name, digests[school_name]):
+                manifest['schools'][school_name].update(file=packet_file_name(school_name), reused=True)
+                output.append(f"{school_name}: unchanged, reusing last packet")
+                continue
+            
+            # Written beside the packet and swapped in when done, so a job
+            # zipping the old packet meanwhile never reads half a file
+            fd, new_packet_path = tempfile.mkstemp(dir=PACKETS_DIR, suffix='.pdf')
+            os.close(fd)
+            packets.append((school_name, sorted_orders, new_packet_path))
+            output.append(f"{school_name}: {len(sorted_orders)} orders")
+        
+        output.append(f"Building {len(packets)} school packets...")
+        
+        work_dir = tempfile.mkdtemp(prefix='order_forms_')
+        built = {pdf_path for _, _, pdf_path in packets}
+        for school_name, pdf_path, error in write_packets(packets, template, work_dir):
+            manifest['schools'][school_name]['error'] = error
+            output.append(f"  {school_name}: {'done' if pdf_path else error}")
+            if pdf_path:
+                os.replace(pdf_path, packet_paths[school_name])
+                built.discard(pdf_path)
+                manifest['schools'][school_name]['file'] = packet_file_name(school_name)
+                tracker.record(ORDER_FORMS, school_name, digests[school_name], packet_paths[school_name])
+        
+        tracker.save()
+        
+        # Leftovers of packets that failed
+        for pdf_path in built:
+            try:
+                os.remove(pdf_path)
+            except OSError:
+                pass
+        try:
+            os.rmdir(work_dir)
+        except:
+            pass
+        
+        # One download with every school's PDF and the manifest
+        zip_filename = f"Order_Forms_{timestamp}.zip"
+        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('manifest.json', json.dumps(manifest, indent=2))
+            for school_name, school in manifest['schools'].items():
+                if school['file']:
+                    zf.write(packet_paths[school_name], school['file'])
+        
+        created = sum(1 for school in manifest['schools'].values() if school['file'])
+        output.append(f"Created order forms for {created} of {len(school_names)} schools: {zip_filename}")
+        
+        return "\n".join(output), None, zip_filename
+        
+    except Exception as e:
+        import traceback
+        return "\n".join(output), f"{str(e)}\n{traceback.format_exc()}", None
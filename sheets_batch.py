@@ -0,0 +1,181 @@
+from gspread.utils import a1_range_to_grid_range, absolute_range_name
+
+# Keep each call well under the Sheets API payload limits
+MAX_REQUESTS_PER_CALL = 1000
+MAX_CELLS_PER_CALL = 50000
+
+
+class SheetsBatch:
+    """Collects sheet adds, formats and value writes for one spreadsheet
+
+    Nothing is sent until execute(), which uses one spreadsheets.batchUpdate
+    for structure and formatting, one values.batchClear and one
+    values.batchUpdate (each split into chunks only when very large).
+    """
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+        self.requests = []
+        self.clear_ranges = []
+        self.value_writes = []
+
+        # Sheet ids and row counts, from a single metadata request
+        self.sheets = {}
+        for sheet in spreadsheet.worksheets():
+            self.sheets[sheet.title] = {'id': sheet.id, 'rows': sheet.row_count}
+
+    def has_sheet(self, title):
+        return title in self.sheets
+
+    def sheet_id(self, title):
+        return self.sheets[title]['id']
+
+    def read_values(self, titles, range_name='A:I'):
+        """Read the same range from several sheets in one request"""
+        if not titles:
+            return {}
+        response = self.spreadsheet.values_batch_get([absolute_range_name(title, range_name) for title in titles])
+        return {
+            title: value_range.get('values', [])
+            for title, value_range in zip(titles, response.get('valueRanges', []))
+        }
+
+    def add_sheet(self, title, rows=1000, cols=20):
+        """Plan a new sheet and return its id (chosen here so later requests can use it)"""
+        sheet_id = max([sheet['id'] for sheet in self.sheets.values()] + [0]) + 1
+        self.sheets[title] = {'id': sheet_id, 'rows': rows}
+        self.requests.append({
+            'addSheet': {
+                'properties': {
+                    'sheetId': sheet_id,
+                    'title': title,
+                    'gridProperties': {'rowCount': rows, 'columnCount': cols}
+                }
+            }
+        })
+        return sheet_id
+
+    def add_request(self, request):
+        """Plan a raw spreadsheets.batchUpdate request"""
+        self.requests.append(request)
+
+    def format(self, title, range_name, cell_format):
+        """Plan the same formatting as Worksheet.format(range_name, cell_format)"""
+        self.requests.append({
+            'repeatCell': {
+                'range': a1_range_to_grid_range(range_name, self.sheet_id(title)),
+                'cell': {'userEnteredFormat': cell_format},
+                'fields': "userEnteredFormat(%s)" % ",".join(cell_format.keys())
+            }
+        })
+
+    def clear(self, title):
+        """Plan clearing all values (not formatting) of a sheet"""
+        self.clear_ranges.append(absolute_range_name(title))
+
+    def write_rows(self, title, first_row, rows):
+        """Plan writing rows starting at column A of first_row"""
+        if not rows:
+            return
+        self._ensure_rows(title, first_row + len(rows) - 1)
+        self.value_writes.append((title, first_row, rows))
+
+    def insert_rows(self, title, rows, row=2):
+        """Plan inserting rows above the given row, like Worksheet.insert_rows"""
+        if not rows:
+            return
+        self.requests.append({
+            'insertDimension': {
+                'range': {
+                    'sheetId': self.sheet_id(title),
+                    'dimension': 'ROWS',
+                    'startIndex': row - 1,
+                    'endIndex': row - 1 + len(rows)
+                },
+                'inheritFromBefore': False
+            }
+        })
+        self.sheets[title]['rows'] += len(rows)
+        self.value_writes.append((title, row, rows))
+
+    def delete_rows(self, title, row_numbers):
+        """Plan deleting rows (1-based numbers, in any order), one request per run of adjacent rows"""
+        runs = []
+        for row in sorted(set(row_numbers)):
+            if runs and runs[-1][1] == row - 1:
+                runs[-1][1] = row
+            else:
+                runs.append([row, row])
+
+        # Bottom run first so the row numbers of the others don't move
+        for first, last in reversed(runs):
+            self.requests.append({
+                'deleteDimension': {
+                    'range': {
+                        'sheetId': self.sheet_id(title),
+                        'dimension': 'ROWS',
+                        'startIndex': first - 1,
+                        'endIndex': last
+                    }
+                }
+            })
+        self.sheets[title]['rows'] -= sum(last - first + 1 for first, last in runs)
+
+    def _ensure_rows(self, title, last_row):
+        """Grow a sheet's grid so a value write fits (values.batchUpdate won't)"""
+        sheet = self.sheets[title]
+        if last_row > sheet['rows']:
+            self.requests.append({
+                'appendDimension': {
+                    'sheetId': sheet['id'],
+                    'dimension': 'ROWS',
+                    'length': last_row - sheet['rows']
+                }
+            })
+            sheet['rows'] = last_row
+
+    def _value_chunks(self):
+        """Split planned value writes into values.batchUpdate bodies"""
+        chunk = []
+        chunk_cells = 0
+
+        for title, first_row, rows in self.value_writes:
+            width = max(len(row) for row in rows) or 1
+            rows_per_piece = max(1, MAX_CELLS_PER_CALL // width)
+
+            for offset in range(0, len(rows), rows_per_piece):
+                piece = rows[offset:offset + rows_per_piece]
+                if chunk and chunk_cells + len(piece) * width > MAX_CELLS_PER_CALL:
+                    yield chunk
+                    chunk = []
+                    chunk_cells = 0
+
+                chunk.append({
+                    'range': absolute_range_name(title, f"A{first_row + offset}"),
+                    'values': piece
+                })
+                chunk_cells += len(piece) * width
+
+        if chunk:
+            yield chunk
+
+    def execute(self):
+        """Send everything planned, returns the number of API calls made"""
+        calls = 0
+
+        for start in range(0, len(self.requests), MAX_REQUESTS_PER_CALL):
+            self.spreadsheet.batch_update({'requests': self.requests[start:start + MAX_REQUESTS_PER_CALL]})
+            calls += 1
+
+        if self.clear_ranges:
+            self.spreadsheet.values_batch_clear(body={'ranges': self.clear_ranges})
+            calls += 1
+
+        for data in self._value_chunks():
+            self.spreadsheet.values_batch_update({'valueInputOption': 'RAW', 'data': data})
+            calls += 1
+
+        self.requests = []
+        self.clear_ranges = []
+        self.value_writes = []
+        return calls